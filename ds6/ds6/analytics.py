@@ -0,0 +1,133 @@
+"""
+Analytics pipeline for ShadeFit.
+Request handlers drop analysis events onto a bounded in-process queue; a
+background thread folds them into fixed-size counters and periodically
+publishes a snapshot that /analytics and /dashboard-data read.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+UNDERTONES = ('warm', 'cool', 'neutral')
+
+
+class AnalyticsPipeline:
+    """Non-blocking event recorder with a background aggregator"""
+
+    def __init__(self, categories=(), queue_size=10000, snapshot_interval=1.0,
+                 window_seconds=60, n_windows=1440, max_products=100):
+        self.queue_size = queue_size
+        self.snapshot_interval = snapshot_interval
+
+        # Rolling per-window counts in a ring buffer (default: 24h of minutes)
+        self.window_seconds = window_seconds
+        self.n_windows = n_windows
+        self._window_counts = [0] * n_windows
+        self._window_ids = [-1] * n_windows
+
+        self._categories = Counter({c: 0 for c in categories})
+        self._undertones = Counter({u: 0 for u in UNDERTONES})
+        self._products = Counter()
+        self.max_products = max_products
+        self._total = 0
+        self.dropped = 0
+
+        self._snapshot = self._build_snapshot()
+        self._start()
+        # Threads do not survive fork; pre-forked workers get their own aggregator
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = threading.Thread(target=self._run, name='analytics-aggregator', daemon=True)
+        self._thread.start()
+
+    def record(self, result):
+        """Queue a successful /analyze result; never blocks the request"""
+        if not result.get('success'):
+            return
+        analysis = result['analysis']
+        # Every analysis gets shades from every brand; only the single closest match varies
+        foundations = [r for r in result['recommendations'] if r['type'] == 'foundation']
+        best = min(foundations, key=lambda r: r['delta_e'], default=None)
+        product = f"{best['brand']} Foundation {best['shade']}" if best else None
+        try:
+            self._queue.put_nowait((time.time(), analysis['category'], analysis['undertone'], product))
+        except queue.Full:
+            self.dropped += 1
+
+    def snapshot(self):
+        """Latest published aggregate; replaced atomically by the aggregator"""
+        return self._snapshot
+
+    def _run(self):
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while True:
+            timeout = max(0.0, next_snapshot - time.monotonic())
+            try:
+                self._apply(self._queue.get(timeout=timeout))
+                # Drain whatever else is waiting before checking the clock again
+                while True:
+                    self._apply(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if time.monotonic() >= next_snapshot:
+                snapshot = self._build_snapshot()
+                # Republish only when the numbers move, so an idle snapshot (and the
+                # ETag served for it) stays the same object; updated_at marks the change
+                if self._without_time(snapshot) != self._without_time(self._snapshot):
+                    self._snapshot = snapshot
+                next_snapshot = time.monotonic() + self.snapshot_interval
+
+    def _apply(self, event):
+        timestamp, category, undertone, product = event
+        self._total += 1
+        self._categories[category] += 1
+        self._undertones[undertone] += 1
+
+        window = int(timestamp // self.window_seconds)
+        slot = window % self.n_windows
+        if self._window_ids[slot] != window:
+            self._window_ids[slot] = window
+            self._window_counts[slot] = 0
+        self._window_counts[slot] += 1
+
+        if product is not None:
+            self._products[product] += 1
+        if len(self._products) > self.max_products:
+            # Keep memory bounded by dropping the long tail
+            self._products = Counter(dict(self._products.most_common(self.max_products // 2)))
+
+    def _windows_since(self, seconds, now):
+        current = int(now // self.window_seconds)
+        oldest = current - seconds // self.window_seconds
+        return sum(count for window, count in zip(self._window_ids, self._window_counts)
+                   if oldest < window <= current)
+
+    @staticmethod
+    def _distribution(counter):
+        """Percentages (rounded) per key"""
+        total = sum(counter.values())
+        return {key: round(100 * count / total, 1) if total else 0 for key, count in counter.items()}
+
+    @staticmethod
+    def _without_time(snapshot):
+        return {key: value for key, value in snapshot.items() if key != 'updated_at'}
+
+    def _build_snapshot(self):
+        now = time.time()
+        return {
+            'total_analyses': self._total,
+            'analyses_last_hour': self._windows_since(3600, now),
+            'analyses_today': self._windows_since(24 * 3600, now),
+            'popular_products': [{'name': name, 'count': count}
+                                 for name, count in self._products.most_common(3)],
+            'skin_tone_distribution': self._distribution(self._categories),
+            'undertone_distribution': self._distribution(self._undertones),
+            'dropped_events': self.dropped,
+            'updated_at': now
+        }
@@ -1,361 +1,356 @@
-from flask import Flask, request, jsonify, render_template
-import cv2
-import numpy as np
-from sklearn.cluster import KMeans
-import colorsys
+import time
+
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 import base64
-from io import BytesIO
-from PIL import Image
 import json
+import os
+import threading
+import metrics
+from batch import get_batch_analyzer
+from result_cache import ResultCache
+from product_catalog import ProductCatalog
+from analytics import AnalyticsPipeline
+from serving import AnalysisExecutor, QueueFullError
+from responses import StaticPayload, SnapshotPayload, compact_result
+from skin_tones import SKIN_TONE_CATEGORIES, category_label
 
 app = Flask(__name__)
 
-class SkinToneAnalyzer:
-    def __init__(self):
-        self.skin_tone_categories = {
-            'very_light': {'range': (0, 80), 'undertones': ['cool', 'neutral', 'warm']},
-            'light': {'range': (80, 120), 'undertones': ['cool', 'neutral', 'warm']},
-            'light_medium': {'range': (120, 160), 'undertones': ['cool', 'neutral', 'warm']},
-            'medium': {'range': (160, 200), 'undertones': ['cool', 'neutral', 'warm']},
-            'medium_deep': {'range': (200, 230), 'undertones': ['cool', 'neutral', 'warm']},
-            'deep': {'range': (230, 255), 'undertones': ['cool', 'neutral', 'warm']}
-        }
-        
-        self.foundation_database = {
-            'fenty_beauty': {
-                'very_light_cool': ['100', '110', '120'],
-                'light_warm': ['150', '160', '170'],
-                'medium_neutral': ['240', '250', '260'],
-                'deep_warm': ['385', '400', '420']
-            },
-            'rare_beauty': {
-                'light_cool': ['110C', '120C', '130C'],
-                'medium_warm': ['210W', '220W', '230W'],
-                'deep_neutral': ['340N', '350N', '360N']
-            }
-        }
+# Uploads are read into memory whole (the result cache keys on their bytes), so
+# cap request bodies before any of it is buffered. Batches share the same cap.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('SHADEFIT_MAX_UPLOAD_MB', 32)) * 1024 * 1024
 
-    def analyze_image(self, image_data):
-        """Analyze skin tone from base64 image data"""
-        try:
-            # Decode base64 image
-            image_bytes = base64.b64decode(image_data.split(',')[1])
-            image = Image.open(BytesIO(image_bytes))
-            image_np = np.array(image)
-            
-            # Convert to RGB if needed
-            if len(image_np.shape) == 3 and image_np.shape[2] == 4:
-                image_np = cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
-            elif len(image_np.shape) == 3 and image_np.shape[2] == 3:
-                image_np = cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB)
-            
-            # Extract skin tone
-            skin_color = self.extract_dominant_skin_color(image_np)
-            
-            # Analyze undertones and category
-            analysis = self.categorize_skin_tone(skin_color)
-            
-            # Get product recommendations
-            recommendations = self.get_product_recommendations(analysis)
-            
-            return {
-                'success': True,
-                'analysis': analysis,
-                'recommendations': recommendations
-            }
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+DEFAULT_PRODUCT_CATALOG = os.environ.get(
+    'SHADEFIT_PRODUCT_CATALOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'products.json')
+)
+PROFILE_DB_PATH = os.environ.get(
+    'SHADEFIT_PROFILE_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles.db')
+)
 
-    def extract_dominant_skin_color(self, image):
-        """Extract dominant skin color using face detection and color clustering"""
-        # Load face cascade
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        
-        # Detect faces
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        if len(faces) > 0:
-            # Use the first detected face
-            (x, y, w, h) = faces[0]
-            
-            # Extract face region with some padding
-            padding = 20
-            face_region = image[max(0, y-padding):min(image.shape[0], y+h+padding),
-                              max(0, x-padding):min(image.shape[1], x+w+padding)]
-        else:
-            # If no face detected, use center region
-            h, w = image.shape[:2]
-            center_x, center_y = w//2, h//2
-            region_size = min(w, h) // 3
-            face_region = image[center_y-region_size//2:center_y+region_size//2,
-                              center_x-region_size//2:center_x+region_size//2]
-        
-        # Reshape for clustering
-        pixels = face_region.reshape(-1, 3)
-        
-        # Remove very dark and very light pixels (likely not skin)
-        mask = np.all(pixels > [30, 30, 30], axis=1) & np.all(pixels < [250, 250, 250], axis=1)
-        skin_pixels = pixels[mask]
-        
-        if len(skin_pixels) == 0:
-            # Fallback to all pixels
-            skin_pixels = pixels
-        
-        # Use K-means to find dominant colors
-        kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-        kmeans.fit(skin_pixels)
-        
-        # Get the most frequent cluster (dominant color)
-        labels = kmeans.labels_
-        unique, counts = np.unique(labels, return_counts=True)
-        dominant_cluster = unique[np.argmax(counts)]
-        dominant_color = kmeans.cluster_centers_[dominant_cluster]
-        
-        return dominant_color.astype(int)
+# Set SHADEFIT_CACHE_PATH to keep cached results across restarts.
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('SHADEFIT_CACHE_ENTRIES', 1024)),
+    ttl=int(os.environ.get('SHADEFIT_CACHE_TTL', 24 * 3600)),
+    disk_path=os.environ.get('SHADEFIT_CACHE_PATH'),
+    max_disk_entries=int(os.environ.get('SHADEFIT_CACHE_DISK_ENTRIES', 10000))
+)
 
-    def categorize_skin_tone(self, rgb_color):
-        """Categorize skin tone and determine undertones"""
-        r, g, b = rgb_color
-        
-        # Calculate brightness
-        brightness = (r + g + b) / 3
-        
-        # Determine category based on brightness
-        category = 'medium'
-        for cat_name, cat_info in self.skin_tone_categories.items():
-            if cat_info['range'][0] <= brightness <= cat_info['range'][1]:
-                category = cat_name
-                break
-        
-        # Determine undertone
-        undertone = self.determine_undertone(r, g, b)
-        
-        # Convert to other color spaces
-        hex_color = f"#{r:02x}{g:02x}{b:02x}"
-        hsl = self.rgb_to_hsl(r, g, b)
-        
-        return {
-            'category': category.replace('_', ' ').title(),
-            'undertone': undertone,
-            'rgb': f"rgb({r}, {g}, {b})",
-            'hex': hex_color,
-            'hsl': f"hsl({hsl[0]}, {hsl[1]}%, {hsl[2]}%)",
-            'brightness': brightness,
-            'dominant_color': {'r': int(r), 'g': int(g), 'b': int(b)}
-        }
+# Analyses run on a bounded pool so light routes stay responsive under load
+analysis_executor = AnalysisExecutor(
+    workers=int(os.environ.get('SHADEFIT_ANALYSIS_WORKERS', os.cpu_count() or 1)),
+    queue_depth=int(os.environ.get('SHADEFIT_ANALYSIS_QUEUE', 16))
+)
 
-    def determine_undertone(self, r, g, b):
-        """Determine undertone based on RGB values"""
-        # Convert to different color space for better undertone detection
-        h, s, v = colorsys.rgb_to_hsv(r/255, g/255, b/255)
-        
-        # Hue-based undertone detection
-        hue_degrees = h * 360
-        
-        if 15 <= hue_degrees <= 45:  # Yellow-orange range
-            return 'warm'
-        elif 200 <= hue_degrees <= 260:  # Blue range
-            return 'cool'
-        else:
-            # Additional checks based on RGB ratios
-            if r > g and r > b:
-                return 'warm'
-            elif b > r and b > g:
-                return 'cool'
-            else:
-                return 'neutral'
-
-    def rgb_to_hsl(self, r, g, b):
-        """Convert RGB to HSL"""
-        r, g, b = r/255.0, g/255.0, b/255.0
-        max_val = max(r, g, b)
-        min_val = min(r, g, b)
-        diff = max_val - min_val
-        
-        # Lightness
-        l = (max_val + min_val) / 2
-        
-        if diff == 0:
-            h = s = 0
-        else:
-            # Saturation
-            s = diff / (2 - max_val - min_val) if l > 0.5 else diff / (max_val + min_val)
-            
-            # Hue
-            if max_val == r:
-                h = (g - b) / diff + (6 if g < b else 0)
-            elif max_val == g:
-                h = (b - r) / diff + 2
-            else:
-                h = (r - g) / diff + 4
-            h /= 6
-        
-        return [round(h * 360), round(s * 100), round(l * 100)]
+# Product catalog is loaded and indexed once
+product_catalog = ProductCatalog(DEFAULT_PRODUCT_CATALOG)
 
-    def get_product_recommendations(self, analysis):
-        """Get foundation and product recommendations based on analysis"""
-        category = analysis['category'].lower().replace(' ', '_')
-        undertone = analysis['undertone']
-        
-        recommendations = []
-        
-        # Foundation recommendations
-        for brand, shades in self.foundation_database.items():
-            key = f"{category}_{undertone}"
-            if key in shades:
-                for shade in shades[key][:2]:  # Top 2 shades per brand
-                    recommendations.append({
-                        'type': 'foundation',
-                        'brand': brand.replace('_', ' ').title(),
-                        'shade': shade,
-                        'match_confidence': 0.9
-                    })
-        
-        # Generate complementary shades
-        r, g, b = analysis['dominant_color']['r'], analysis['dominant_color']['g'], analysis['dominant_color']['b']
-        
-        # Perfect match
-        recommendations.append({
-            'type': 'perfect_match',
-            'name': 'Perfect Match',
-            'color': f"rgb({r}, {g}, {b})",
-            'hex': analysis['hex']
-        })
-        
-        # Slightly lighter
-        lighter_r = min(255, r + 20)
-        lighter_g = min(255, g + 20)
-        lighter_b = min(255, b + 20)
-        recommendations.append({
-            'type': 'lighter',
-            'name': 'Slightly Lighter',
-            'color': f"rgb({lighter_r}, {lighter_g}, {lighter_b})",
-            'hex': f"#{lighter_r:02x}{lighter_g:02x}{lighter_b:02x}"
-        })
-        
-        # Slightly darker
-        darker_r = max(0, r - 20)
-        darker_g = max(0, g - 20)
-        darker_b = max(0, b - 20)
-        recommendations.append({
-            'type': 'darker',
-            'name': 'Slightly Darker',
-            'color': f"rgb({darker_r}, {darker_g}, {darker_b})",
-            'hex': f"#{darker_r:02x}{darker_g:02x}{darker_b:02x}"
-        })
-        
-        return recommendations
+# Analysis events feed /analytics and /dashboard-data
+analytics = AnalyticsPipeline(categories=[category_label(name) for name in SKIN_TONE_CATEGORIES])
+
+# Serialized once per published snapshot rather than once per request
+analytics_payload = SnapshotPayload(analytics.snapshot)
+dashboard_payload = SnapshotPayload(analytics.snapshot, lambda snapshot: {'analytics': snapshot})
+
+TRENDING = {
+    'colors': [
+        {'name': 'Coral Crush', 'hex': '#ff7f7f', 'popularity': 95},
+        {'name': 'Golden Hour', 'hex': '#ffd700', 'popularity': 88},
+        {'name': 'Berry Bliss', 'hex': '#8b3a62', 'popularity': 82}
+    ],
+    'products': [
+        {'name': 'Dewy Foundation', 'category': 'foundation', 'trend_score': 92},
+        {'name': 'Glossy Lips', 'category': 'lipstick', 'trend_score': 87},
+        {'name': 'Natural Blush', 'category': 'blush', 'trend_score': 79}
+    ],
+    'techniques': [
+        {'name': 'No-Makeup Makeup', 'difficulty': 'Easy', 'popularity': 94},
+        {'name': 'Glass Skin', 'difficulty': 'Medium', 'popularity': 89},
+        {'name': 'Soft Glam', 'difficulty': 'Medium', 'popularity': 85}
+    ]
+}
+trending_payload = StaticPayload(TRENDING)
+
+# The analyzer (OpenCV, NumPy, PIL, Haar cascade, shade index) and the video
+# session store are built on first use, so lightweight routes never pay for them
+_analyzer = None
+_stream_sessions = None
+_analysis_lock = threading.Lock()
+
+# Opened (and its writer thread started) on first use, after any worker fork
+_profile_store = None
+_profile_store_lock = threading.Lock()
 
-# Initialize analyzer
-analyzer = SkinToneAnalyzer()
+startup_stats = {'app_import_ms': None, 'analysis_load_ms': None, 'preloaded': False}
+
+def get_analyzer():
+    """The shared SkinToneAnalyzer, imported and built on first use"""
+    global _analyzer
+    if _analyzer is None:
+        with _analysis_lock:
+            if _analyzer is None:
+                started = time.perf_counter()
+                from skin_analyzer import SkinToneAnalyzer
+                analyzer = SkinToneAnalyzer(cache=result_cache)
+                analyzer.face_detector.warmup()
+                startup_stats['analysis_load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                _analyzer = analyzer
+    return _analyzer
+
+def get_stream_sessions():
+    """Live video sessions: detection every few frames, tracking in between"""
+    global _stream_sessions
+    if _stream_sessions is None:
+        analyzer = get_analyzer()
+        with _analysis_lock:
+            if _stream_sessions is None:
+                from video_stream import StreamSessionStore
+                _stream_sessions = StreamSessionStore(analyzer)
+    return _stream_sessions
+
+def get_profile_store():
+    """The shared ProfileStore, opened on first use"""
+    global _profile_store
+    if _profile_store is None:
+        with _profile_store_lock:
+            if _profile_store is None:
+                from profile_store import ProfileStore
+                _profile_store = ProfileStore(
+                    PROFILE_DB_PATH,
+                    max_history=int(os.environ.get('SHADEFIT_PROFILE_HISTORY', 20))
+                )
+    return _profile_store
+
+def preload():
+    """Load the analysis subsystem now instead of on the first analysis
+    
+    Call before forking workers (e.g. gunicorn --preload with
+    SHADEFIT_PRELOAD=1) so the imported modules, cascade and shade index are
+    shared copy-on-write.
+    """
+    get_stream_sessions()
+    startup_stats['preloaded'] = True
+
+if os.environ.get('SHADEFIT_PRELOAD', '').lower() in ('1', 'true', 'yes'):
+    preload()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Request bodies that are passed to the decoder as-is
+RAW_IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'application/octet-stream'}
+
+def bool_arg(value):
+    """Query-string flag parser: 1/true/yes are true"""
+    return value.lower() in ('1', 'true', 'yes')
+
+def run_analysis(fn, source, timings=False, mode='single'):
+    """fn(source, mode) on the analysis pool; with timings, attach a per-stage breakdown in ms"""
+    def job():
+        with metrics.timer('total'):
+            if not timings:
+                return fn(source, mode)
+            with metrics.collect_timings() as stage_ms:
+                result = fn(source, mode)
+        return dict(result, timings=stage_ms)
+    
+    return analysis_executor.run(job)
+
+def record_analysis(result, user_id=None):
+    """Feed analytics one event per analyzed person, and keep the user's result"""
+    if result.get('mode') == 'faces':
+        for face in result['faces']:
+            analytics.record(dict(face, success=True))
+    else:
+        analytics.record(result)
+    if user_id and result.get('success'):
+        get_profile_store().save_analysis(user_id, {k: v for k, v in result.items() if k != 'timings'})
+
+# Longest accepted user id for the profile routes
+MAX_USER_ID_LENGTH = 128
+
+def valid_user_id(user_id):
+    return isinstance(user_id, str) and 0 < len(user_id) <= MAX_USER_ID_LENGTH
+
 @app.route('/analyze', methods=['POST'])
 def analyze_skin_tone():
-    """API endpoint for skin tone analysis"""
+    """API endpoint for skin tone analysis
+    
+    Accepts a JSON body with a base64 data URL, a raw image body
+    (image/jpeg, image/png) or a multipart upload with an 'image' file.
+    Pass ?timings=1 (or "timings": true in the JSON body) to get a
+    per-stage timing breakdown in the response, and ?schema=compact (or
+    "schema": "compact") for the compact response schema. ?mode=faces
+    analyzes every detected face and ?mode=regions the forehead, cheeks and
+    jaw of the first face (or "mode" in the JSON body). With ?user_id= (or
+    "user_id"), a successful result is stored as that user's last analysis.
+    """
     try:
-        data = request.get_json()
-        image_data = data.get('image')
-        
-        if not image_data:
-            return jsonify({'success': False, 'error': 'No image data provided'})
-        
-        result = analyzer.analyze_image(image_data)
-        return jsonify(result)
-        
+        analyzer = get_analyzer()
+        timings = request.args.get('timings', default=False, type=bool_arg)
+        compact = request.args.get('schema') == 'compact'
+        mode = request.args.get('mode', 'single')
+        user_id = request.args.get('user_id')
+        if user_id is not None and not valid_user_id(user_id):
+            return jsonify({'success': False, 'error': 'Invalid user_id'})
+        if request.mimetype in RAW_IMAGE_TYPES:
+            # Raw image body, read whole (within MAX_CONTENT_LENGTH) for the cache key
+            result = run_analysis(analyzer.analyze_file, request.stream, timings, mode)
+        elif request.mimetype == 'multipart/form-data':
+            upload = request.files.get('image')
+            if upload is None:
+                return jsonify({'success': False, 'error': 'No image file provided'})
+            result = run_analysis(analyzer.analyze_file, upload.stream, timings, mode)
+        else:
+            data = request.get_json()
+            image_data = data.get('image')
+            
+            if not image_data:
+                return jsonify({'success': False, 'error': 'No image data provided'})
+            
+            timings = timings or bool(data.get('timings'))
+            compact = compact or data.get('schema') == 'compact'
+            mode = data.get('mode', mode)
+            user_id = data.get('user_id', user_id)
+            if user_id is not None and not valid_user_id(user_id):
+                return jsonify({'success': False, 'error': 'Invalid user_id'})
+            result = run_analysis(analyzer.analyze_image, image_data, timings, mode)
+        
+        record_analysis(result, user_id)
+        return jsonify(compact_result(result) if compact else result)
+        
+    except (QueueFullError, RequestEntityTooLarge):
+        raise
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-@app.route('/products', methods=['GET'])
-def get_products():
-    """API endpoint for product catalog"""
-    products = [
-        {
-            'id': 1,
-            'name': 'Fenty Beauty Pro Filt\'r Foundation',
-            'brand': 'Fenty Beauty',
-            'price': 36,
-            'category': 'foundation',
-            'shades': ['100', '110', '120', '150', '160', '170', '240', '250', '260'],
-            'rating': 4.8,
-            'coverage': 'full',
-            'finish': 'matte'
-        },
-        {
-            'id': 2,
-            'name': 'Rare Beauty Liquid Touch Foundation',
-            'brand': 'Rare Beauty',
-            'price': 29,
-            'category': 'foundation',
-            'shades': ['110C', '120C', '130C', '210W', '220W', '230W'],
-            'rating': 4.6,
-            'coverage': 'medium',
-            'finish': 'natural'
-        },
-        {
-            'id': 3,
-            'name': 'NARS Natural Radiant Foundation',
-            'brand': 'NARS',
-            'price': 48,
-            'category': 'foundation',
-            'shades': ['Siberia', 'Gobi', 'Stromboli', 'Cadiz'],
-            'rating': 4.7,
-            'coverage': 'medium-full',
-            'finish': 'radiant'
-        }
-    ]
+@app.route('/analyze-batch', methods=['POST'])
+def analyze_batch_endpoint():
+    """Batch skin tone analysis, streamed back as NDJSON
     
-    # Filter by query parameters
-    brand = request.args.get('brand')
-    price_range = request.args.get('price_range')
+    Accepts a multipart upload with several 'images' files or a JSON body
+    {"images": ["data:image/jpeg;base64,...", ...]}. Each line is one result
+    tagged with its input index; the last line summarizes failures.
+    """
+    if request.mimetype == 'multipart/form-data':
+        uploads = request.files.getlist('images')
+        images = [upload.read() for upload in uploads]
+    else:
+        data = request.get_json(silent=True) or {}
+        images = data.get('images')
+        if not isinstance(images, list):
+            return jsonify({'success': False, 'error': 'images must be a list of data URLs'}), 400
+        # Only data URLs are accepted over HTTP, never server-side file paths
+        images = [image if isinstance(image, str) and image.startswith('data:') else None
+                  for image in images]
     
-    filtered_products = products
+    def generate():
+        for result in get_batch_analyzer().summarize(images):
+            if 'index' in result:
+                analytics.record(result)
+            yield json.dumps(result) + '\n'
     
-    if brand:
-        filtered_products = [p for p in filtered_products if p['brand'].lower().replace(' ', '_') == brand]
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Largest k accepted by /shade-match
+MAX_SHADE_MATCHES = 100
+
+@app.route('/shade-match', methods=['GET'])
+def match_shades():
+    """Nearest foundation shades to a color, e.g. /shade-match?hex=c8a083&k=5&brand=fenty_beauty&max_price=40"""
+    try:
+        from color_science import hex_to_rgb
+        rgb = hex_to_rgb(request.args['hex'])
+        brands = request.args.getlist('brand') or None
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        k = request.args.get('k', default=5, type=int)
+        if not 1 <= k <= MAX_SHADE_MATCHES:
+            return jsonify({'error': f'k must be between 1 and {MAX_SHADE_MATCHES}'}), 400
+        
+        shades = get_analyzer().shade_index.nearest(rgb, k=k, brands=brands, min_price=min_price, max_price=max_price)
+        return jsonify({'shades': shades})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/stream/sessions', methods=['POST'])
+def create_stream_session():
+    """Start a video analysis session for live AR feedback"""
+    return jsonify({'success': True, 'session_id': get_stream_sessions().create()})
+
+@app.route('/stream/sessions/<session_id>/frames', methods=['POST'])
+def analyze_stream_frame(session_id):
+    """Analyze one frame of a session (raw image body or JSON data URL)"""
+    if request.mimetype in RAW_IMAGE_TYPES:
+        source = request.get_data()
+    else:
+        data = request.get_json(silent=True) or {}
+        try:
+            source = base64.b64decode(data.get('image', '').split(',')[1])
+        except Exception:
+            return jsonify({'success': False, 'error': 'No image data provided'}), 400
     
-    if price_range:
-        if price_range == '0-25':
-            filtered_products = [p for p in filtered_products if p['price'] <= 25]
-        elif price_range == '25-50':
-            filtered_products = [p for p in filtered_products if 25 < p['price'] <= 50]
-        elif price_range == '50+':
-            filtered_products = [p for p in filtered_products if p['price'] > 50]
+    result = analysis_executor.run(get_stream_sessions().process_frame, session_id, source)
+    if result is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired session'}), 404
+    return jsonify(result)
+
+@app.route('/stream/sessions/<session_id>', methods=['DELETE'])
+def close_stream_session(session_id):
+    """End a video analysis session"""
+    return jsonify({'success': get_stream_sessions().close(session_id)})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Per-stage latency histograms and analysis counters in Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/serving-stats', methods=['GET'])
+def get_serving_stats():
+    """Analysis queue depth, rejections and wait times"""
+    return jsonify(analysis_executor.stats())
+
+@app.route('/startup-stats', methods=['GET'])
+def get_startup_stats():
+    """App import time, analysis subsystem load time and whether it was preloaded"""
+    return jsonify(startup_stats)
+
+@app.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Result cache hit/miss counters"""
+    return jsonify(result_cache.stats())
+
+@app.route('/detector-stats', methods=['GET'])
+def get_detector_stats():
+    """Face detector load time and detection latency"""
+    return jsonify(get_analyzer().face_detector.stats())
+
+@app.route('/products', methods=['GET'])
+def get_products():
+    """API endpoint for product catalog"""
+    body, etag = product_catalog.page(
+        brand=request.args.get('brand'),
+        category=request.args.get('category'),
+        price_range=request.args.get('price_range'),
+        page=max(1, request.args.get('page', default=1, type=int)),
+        per_page=min(200, max(1, request.args.get('per_page', default=50, type=int)))
+    )
     
-    return jsonify({'products': filtered_products})
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = product_catalog.last_modified
+    return response.make_conditional(request)
 
 @app.route('/dashboard-data', methods=['GET'])
 def get_dashboard_data():
     """Enhanced dashboard analytics data"""
     try:
-        return jsonify({
-            'analytics': {
-                'total_users': 125000,
-                'analyses_today': 3247,
-                'popular_products': [
-                    {'name': 'Fenty Beauty Foundation', 'count': 8456},
-                    {'name': 'Lakme Absolute Foundation', 'count': 6890},
-                    {'name': 'Sugar Cosmetics Lipstick', 'count': 5134}
-                ],
-                'skin_tone_distribution': {
-                    'light': 28,
-                    'medium': 52,
-                    'deep': 20
-                },
-                'undertone_distribution': {
-                    'warm': 45,
-                    'cool': 32,
-                    'neutral': 23
-                }
-            }
-        })
+        return dashboard_payload.response(request)
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -404,41 +399,78 @@ def removed_chat_assistant():
 
 @app.route('/save_profile', methods=['POST'])
 def save_profile():
-    """Save user profile data"""
+    """Save user profile data
+    
+    Expects {"user_id": ..., "profile": {...}}. The write is queued and
+    committed in a batch; reads right after it already see the new profile.
+    """
     try:
         data = request.get_json()
-        # In a real app, this would save to a database
-        # For now, we'll just return success
+        user_id = data.get('user_id')
+        profile = data.get('profile')
+        if not valid_user_id(user_id):
+            return jsonify({'success': False, 'error': 'Invalid user_id'})
+        if not isinstance(profile, dict):
+            return jsonify({'success': False, 'error': 'No profile data provided'})
+        
+        get_profile_store().save_profile(user_id, profile)
         return jsonify({'success': True, 'message': 'Profile saved successfully'})
+    except QueueFullError:
+        raise
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/profiles/<user_id>', methods=['GET'])
+def get_profile(user_id):
+    """A saved profile"""
+    try:
+        profile = get_profile_store().get_profile(user_id)
+        if profile is None:
+            return jsonify({'success': False, 'error': 'Profile not found'}), 404
+        return jsonify(dict(profile, success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/profiles/<user_id>/last-analysis', methods=['GET'])
+def get_last_analysis(user_id):
+    """The user's most recent /analyze result, so returning users can skip re-analysis
+    
+    Served from the profile store; ?schema=compact as for /analyze.
+    """
+    try:
+        entry = get_profile_store().last_analysis(user_id)
+        if entry is None:
+            return jsonify({'success': False, 'error': 'No stored analysis'}), 404
+        result = entry['result']
+        if request.args.get('schema') == 'compact':
+            result = compact_result(result)
+        return jsonify(dict(result, analyzed_at=entry['analyzed_at']))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/profiles/<user_id>/analyses', methods=['GET'])
+def get_analysis_history(user_id):
+    """The user's stored analyses, newest first (?limit=, up to the retained history)"""
+    try:
+        limit = request.args.get('limit', default=None, type=int)
+        if limit is not None and limit < 1:
+            return jsonify({'success': False, 'error': 'limit must be at least 1'}), 400
+        history = get_profile_store().history(user_id, limit)
+        return jsonify({'success': True, 'analyses': history})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/profile-stats', methods=['GET'])
+def get_profile_stats():
+    """Profile store write batching statistics"""
+    return jsonify(get_profile_store().stats())
+
 @app.route('/analytics', methods=['GET'])
 def get_analytics():
     """Get analytics data for dashboard"""
     try:
-        # In a real app, this would fetch from database
-        # For demo, return sample analytics
-        analytics = {
-            'total_users': 50000,
-            'analyses_today': 1247,
-            'popular_products': [
-                {'name': 'Fenty Beauty Foundation', 'count': 3456},
-                {'name': 'Rare Beauty Blush', 'count': 2890},
-                {'name': 'NARS Lipstick', 'count': 2134}
-            ],
-            'skin_tone_distribution': {
-                'light': 25,
-                'medium': 45,
-                'deep': 30
-            },
-            'undertone_distribution': {
-                'warm': 40,
-                'cool': 35,
-                'neutral': 25
-            }
-        }
-        return jsonify(analytics)
+        # Aggregated in the background from recorded /analyze results
+        return analytics_payload.response(request)
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -446,24 +478,7 @@ def get_analytics():
 def get_trending():
     """Get trending products and colors"""
     try:
-        trending = {
-            'colors': [
-                {'name': 'Coral Crush', 'hex': '#ff7f7f', 'popularity': 95},
-                {'name': 'Golden Hour', 'hex': '#ffd700', 'popularity': 88},
-                {'name': 'Berry Bliss', 'hex': '#8b3a62', 'popularity': 82}
-            ],
-            'products': [
-                {'name': 'Dewy Foundation', 'category': 'foundation', 'trend_score': 92},
-                {'name': 'Glossy Lips', 'category': 'lipstick', 'trend_score': 87},
-                {'name': 'Natural Blush', 'category': 'blush', 'trend_score': 79}
-            ],
-            'techniques': [
-                {'name': 'No-Makeup Makeup', 'difficulty': 'Easy', 'popularity': 94},
-                {'name': 'Glass Skin', 'difficulty': 'Medium', 'popularity': 89},
-                {'name': 'Soft Glam', 'difficulty': 'Medium', 'popularity': 85}
-            ]
-        }
-        return jsonify(trending)
+        return trending_payload.response(request)
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -472,9 +487,26 @@ def get_trending():
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
 
+@app.errorhandler(QueueFullError)
+def queue_full(error):
+    response = jsonify({'success': False, 'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    return jsonify({'success': False, 'error': 'Upload exceeds the request size limit'}), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+startup_stats['app_import_ms'] = round((time.perf_counter() - _import_started) * 1000, 1)
+
 if __name__ == '__main__':
+    # Batch workers started with spawn/forkserver re-run the main script as
+    # __mp_main__, which would rebuild this whole module (cache, threads, preload)
+    # in every worker. Without a __file__, multiprocessing leaves __main__ alone.
+    del __file__
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Batch skin tone analysis for ShadeFit.
+Spreads decode, face detection and clustering across a process pool and yields
+results as each image finishes, so one bad input never aborts the batch.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+# Per-process analyzer, built once by the pool initializer
+_worker_analyzer = None
+
+
+def _init_worker(analyzer_options):
+    """Build one analyzer per worker process"""
+    global _worker_analyzer
+    import cv2
+    from skin_analyzer import SkinToneAnalyzer
+
+    # One OpenCV thread per process; the pool itself provides the parallelism
+    cv2.setNumThreads(1)
+    _worker_analyzer = SkinToneAnalyzer(**analyzer_options)
+    _worker_analyzer.face_detector.warmup()
+
+
+def _analyze_one(image):
+    """Analyze raw bytes, a data URL string or an image file path"""
+    if not image:
+        return {'success': False, 'error': 'No image data provided'}
+    if isinstance(image, str):
+        if image.startswith('data:'):
+            return _worker_analyzer.analyze_image(image)
+        with open(image, 'rb') as f:
+            return _worker_analyzer.analyze_file(f)
+    return _worker_analyzer.analyze_file(image)
+
+
+def _pool_context():
+    """Start workers from a clean process rather than forking the threaded server
+
+    The forkserver imports the analysis modules once, so workers still start
+    without re-importing OpenCV and NumPy. Each worker does re-run the parent's
+    main script as __mp_main__, so launchers must keep app setup behind their
+    __main__ guard (see run.py). Falls back to spawn where forkserver is
+    unavailable.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['batch', 'skin_analyzer'])
+    return context
+
+
+class BatchAnalyzer:
+    """Process pool that analyzes many images per call"""
+
+    def __init__(self, workers=None, analyzer_options=None, max_in_flight=None):
+        self.workers = workers or os.cpu_count() or 1
+        # Bound the number of submitted images so huge batches don't sit in memory
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.analyzer_options = analyzer_options or {}
+        self.restarts = 0
+        self._pool_lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context(),
+                                   initializer=_init_worker, initargs=(self.analyzer_options,))
+
+    def _replace_pool(self, broken):
+        """Swap in a fresh pool after a worker died; every caller of a broken pool
+        sees BrokenProcessPool, so only the first one replaces it"""
+        with self._pool_lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+                self.restarts += 1
+            return self._pool
+
+    def _submit(self, image):
+        pool = self._pool
+        try:
+            return pool.submit(_analyze_one, image), pool
+        except BrokenProcessPool:
+            pool = self._replace_pool(pool)
+            return pool.submit(_analyze_one, image), pool
+
+    def analyze(self, images):
+        """Yield {'index': i, ...result} dicts in completion order
+
+        If a worker process dies, the images it and its pool were working on are
+        reported as failed and the rest of the batch runs on a new pool.
+        """
+        pending = {}
+        images = enumerate(images)
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < self.max_in_flight:
+                try:
+                    index, image = next(images)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future, pool = self._submit(image)
+                pending[future] = (index, pool)
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, pool = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    self._replace_pool(pool)
+                    result = {'success': False, 'error': 'Analysis worker exited unexpectedly'}
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+                yield dict(result, index=index)
+
+    def summarize(self, images):
+        """Yield each result, then a summary with failures and throughput"""
+        start = time.perf_counter()
+        total = 0
+        failed = []
+
+        for result in self.analyze(images):
+            total += 1
+            if not result['success']:
+                failed.append(result['index'])
+            yield result
+
+        elapsed = time.perf_counter() - start
+        yield {
+            'done': True,
+            'total': total,
+            'succeeded': total - len(failed),
+            'failed': sorted(failed),
+            'seconds': round(elapsed, 3),
+            'images_per_sec': round(total / elapsed, 2) if elapsed > 0 else None
+        }
+
+    def close(self):
+        self._pool.shutdown()
+
+
+_default_batch_analyzer = None
+_default_batch_lock = threading.Lock()
+
+
+def get_batch_analyzer():
+    """Shared pool sized to the machine, created on first use"""
+    global _default_batch_analyzer
+    if _default_batch_analyzer is None:
+        with _default_batch_lock:
+            if _default_batch_analyzer is None:
+                _default_batch_analyzer = BatchAnalyzer()
+    return _default_batch_analyzer
+
+
+def analyze_batch(images):
+    """Analyze an iterable of images on the shared pool, yielding results as they finish"""
+    return get_batch_analyzer().analyze(images)
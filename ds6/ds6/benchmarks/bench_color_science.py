@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Check the vectorized color conversions and classifiers, and time them against per-pixel loops.
+Run from the project directory: python benchmarks/bench_color_science.py
+"""
+
+import colorsys
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from color_science import (
+    rgb_to_hsv, hsv_to_rgb, rgb_to_hsl, hsl_to_rgb, rgb_to_lab, lab_to_rgb,
+    rgb_to_ycrcb, ycrcb_to_rgb, classify_category, classify_undertone
+)
+from skin_analyzer import SkinToneAnalyzer, VOTE_SAMPLE
+
+# Largest allowed round-trip error in 0-255 RGB units; YCrCb uses OpenCV's
+# 3-decimal coefficients, which do not invert exactly
+MAX_ROUND_TRIP_ERROR = {'hsv': 1e-9, 'lab': 1e-6, 'ycrcb': 1.0}
+N_COLORS = 20000
+
+
+def random_colors(n, seed=0):
+    """Random RGB colors plus every grey level (the hue edge case)"""
+    rng = np.random.default_rng(seed)
+    greys = np.repeat(np.arange(256)[:, None], 3, axis=1)
+    return np.concatenate([rng.integers(0, 256, (n, 3)), greys]).astype(np.float64)
+
+
+def check_round_trips(colors):
+    """Each rgb_to_X followed by X_to_rgb must give back the input"""
+    failures = 0
+    pairs = {
+        'hsv': (rgb_to_hsv, hsv_to_rgb),
+        'lab': (rgb_to_lab, lab_to_rgb),
+        'ycrcb': (rgb_to_ycrcb, ycrcb_to_rgb)
+    }
+    for name, (forward, inverse) in pairs.items():
+        error = float(np.abs(inverse(forward(colors)) - colors).max())
+        ok = error <= MAX_ROUND_TRIP_ERROR[name]
+        failures += not ok
+        print(f'round trip rgb -> {name:<5} -> rgb  max error {error:.2e}  {"ok" if ok else "MISMATCH"}')
+
+    # rgb_to_hsl rounds to whole degrees and percent, so check hsl_to_rgb against
+    # colorsys on the same rounded values instead
+    hsl = rgb_to_hsl(colors)
+    expected = np.array([colorsys.hls_to_rgb(h / 360, l / 100, s / 100) for h, s, l in hsl]) * 255
+    error = float(np.abs(hsl_to_rgb(hsl) - expected).max())
+    ok = error <= 1e-9
+    failures += not ok
+    print(f'hsl_to_rgb vs colorsys  max error {error:.2e}  {"ok" if ok else "MISMATCH"}')
+    return failures
+
+
+def scalar_hsl(r, g, b):
+    """The per-pixel HSL helper SkinToneAnalyzer used before vectorization"""
+    r, g, b = r / 255.0, g / 255.0, b / 255.0
+    max_val, min_val = max(r, g, b), min(r, g, b)
+    diff = max_val - min_val
+    l = (max_val + min_val) / 2
+    if diff == 0:
+        h = s = 0
+    else:
+        s = diff / (2 - max_val - min_val) if l > 0.5 else diff / (max_val + min_val)
+        if max_val == r:
+            h = (g - b) / diff + (6 if g < b else 0)
+        elif max_val == g:
+            h = (b - r) / diff + 2
+        else:
+            h = (r - g) / diff + 4
+        h /= 6
+    return [round(h * 360), round(s * 100), round(l * 100)]
+
+
+def check_scalar(colors):
+    """HSV and HSL must match the scalar code they replaced (colorsys and scalar_hsl)"""
+    hsv = np.array([colorsys.rgb_to_hsv(*c) for c in colors / 255.0])
+    hsl = np.array([scalar_hsl(*c) for c in colors])
+    failures = 0
+    for name, expected, actual in (('hsv', hsv, rgb_to_hsv(colors)),
+                                   ('hsl', hsl, rgb_to_hsl(colors))):
+        error = float(np.abs(expected - actual).max())
+        ok = error <= 1e-9
+        failures += not ok
+        print(f'{name} vs scalar code  max error {error:.2e}  {"ok" if ok else "MISMATCH"}')
+    return failures
+
+
+def check_classify_pixels(analyzer, colors):
+    """classify_pixels must agree with classifying each color on its own"""
+    pixels = colors[:len(colors) // 4].astype(np.uint8)
+    votes = analyzer.classify_pixels(pixels)
+    step = max(1, len(pixels) // VOTE_SAMPLE)
+    sample = pixels[::step]
+
+    categories = [str(classify_category(c, analyzer.skin_tone_categories)) for c in sample]
+    undertones = [str(classify_undertone(c)) for c in sample]
+    failures = 0
+    for name, labels, expected in (('category', categories, votes['category']),
+                                   ('undertone', undertones, votes['undertone'])):
+        for label, percent in expected.items():
+            key = label.lower().replace(' ', '_') if name == 'category' else label
+            actual = round(100 * labels.count(key) / len(labels), 1)
+            if actual != percent:
+                failures += 1
+                print(f'classify_pixels {name} {label}: {percent} != {actual}  MISMATCH')
+    print(f'classify_pixels vs per-pixel labels  {"ok" if not failures else "MISMATCH"}')
+    return failures
+
+
+def timed(fn, repeats=5):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    colors = random_colors(N_COLORS)
+    analyzer = SkinToneAnalyzer()
+
+    failures = check_round_trips(colors) + check_scalar(colors) + check_classify_pixels(analyzer, colors)
+
+    sample = colors[:2000]
+    loop = timed(lambda: [colorsys.rgb_to_hsv(*(c / 255.0)) for c in sample], repeats=1) * len(colors) / len(sample)
+    vector = timed(lambda: rgb_to_hsv(colors))
+    print(f'\nrgb_to_hsv on {len(colors)} colors: {vector * 1000:.2f} ms vectorized, '
+          f'{loop * 1000:.1f} ms per-pixel colorsys ({loop / vector:.0f}x)')
+    print(f'classify_pixels on {len(colors)} colors: {timed(lambda: analyzer.classify_pixels(colors)) * 1000:.2f} ms')
+
+    if failures:
+        print(f'\n{failures} checks failed')
+        sys.exit(1)
+    print('\nAll color science checks passed')
+
+
+if __name__ == '__main__':
+    main()
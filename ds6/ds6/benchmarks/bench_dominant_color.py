@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare dominant color engines against the reference 10-restart sklearn KMeans
+result, including incremental updates fed the same pixels in chunks and
+batched clustering of several faces or regions at once.
+Run from the project directory: python benchmarks/bench_dominant_color.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dominant_color import create_engine, ENGINES, QUALITY_PRESETS, IncrementalDominantColor
+
+# Tolerance (Euclidean RGB distance) for an engine to count as agreeing with KMeans
+MAX_RGB_DISTANCE = 12.0
+
+
+def synthetic_skin_pixels(n_pixels, seed):
+    """Mixture of a dominant skin tone, a shadow tone and some background noise"""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform([120, 80, 60], [240, 200, 170])
+    shadow = base * rng.uniform(0.55, 0.75)
+    n_skin = int(n_pixels * 0.6)
+    n_shadow = int(n_pixels * 0.25)
+    n_noise = n_pixels - n_skin - n_shadow
+    pixels = np.concatenate([
+        rng.normal(base, 8, (n_skin, 3)),
+        rng.normal(shadow, 8, (n_shadow, 3)),
+        rng.uniform(31, 249, (n_noise, 3))
+    ])
+    return np.clip(pixels, 31, 249).astype(np.uint8), base
+
+
+def timed(engine, pixels):
+    start = time.perf_counter()
+    color = engine.dominant_color(pixels)
+    return np.asarray(color, dtype=float), time.perf_counter() - start
+
+
+def main():
+    sizes = [20000, 200000]
+    reference = create_engine('kmeans')
+    failures = 0
+
+    for n_pixels in sizes:
+        for seed in range(3):
+            pixels, _ = synthetic_skin_pixels(n_pixels, seed)
+            ref_color, ref_time = timed(reference, pixels)
+            print(f'{n_pixels:>7} px seed={seed} kmeans          {ref_time * 1000:8.1f} ms  {np.round(ref_color).astype(int)}')
+
+            for name in (n for n in ENGINES if n != 'kmeans'):
+                for quality in QUALITY_PRESETS:
+                    color, elapsed = timed(create_engine(name, quality), pixels)
+                    distance = float(np.linalg.norm(color - ref_color))
+                    ok = distance <= MAX_RGB_DISTANCE
+                    failures += not ok
+                    print(f'{"":>18} {name:<9} {quality:<9} {elapsed * 1000:8.1f} ms  '
+                          f'{np.round(color).astype(int)}  dist={distance:5.2f}  '
+                          f'speedup={ref_time / elapsed:6.1f}x  {"ok" if ok else "MISMATCH"}')
+
+    print('\nIncremental updates (10 chunks) with the prior engine')
+    for n_pixels in sizes:
+        for seed in range(3):
+            pixels, _ = synthetic_skin_pixels(n_pixels, seed)
+            ref_color, _ = timed(reference, pixels)
+            incremental = IncrementalDominantColor(create_engine('prior', 'fast'))
+            start = time.perf_counter()
+            for chunk in np.array_split(pixels, 10):
+                color = incremental.update(chunk)
+            elapsed = time.perf_counter() - start
+            distance = float(np.linalg.norm(np.asarray(color, dtype=float) - ref_color))
+            ok = distance <= MAX_RGB_DISTANCE
+            failures += not ok
+            print(f'{n_pixels:>7} px seed={seed} incremental     {elapsed * 1000:8.1f} ms  '
+                  f'{np.round(color).astype(int)}  dist={distance:5.2f}  {"ok" if ok else "MISMATCH"}')
+
+    print('\nBatched clustering (one dominant_colors call vs a loop of dominant_color)')
+    for n_groups, n_pixels in ((4, 1500), (8, 6000), (8, 20000)):
+        groups = [synthetic_skin_pixels(n_pixels, seed)[0] for seed in range(n_groups)]
+        for quality in QUALITY_PRESETS:
+            engine = create_engine('prior', quality)
+            start = time.perf_counter()
+            looped = np.array([engine.dominant_color(pixels) for pixels in groups])
+            loop_time = time.perf_counter() - start
+            start = time.perf_counter()
+            batched = engine.dominant_colors(groups)
+            batch_time = time.perf_counter() - start
+            ok = np.array_equal(looped, batched)
+            failures += not ok
+            print(f'{n_groups} x {n_pixels:>6} px prior {quality:<9} loop {loop_time * 1000:7.1f} ms  '
+                  f'batch {batch_time * 1000:7.1f} ms  {"identical" if ok else "MISMATCH"}')
+
+    if failures:
+        print(f'\n{failures} engine runs disagreed with KMeans by more than {MAX_RGB_DISTANCE}')
+        sys.exit(1)
+    print('\nAll engines agree with KMeans')
+
+
+if __name__ == '__main__':
+    main()
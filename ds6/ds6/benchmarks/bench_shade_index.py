@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Query latency of the shade index at different catalog sizes.
+Run from the project directory: python benchmarks/bench_shade_index.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shade_index import ShadeIndex
+
+SIZES = [1_000, 100_000, 1_000_000]
+N_BRANDS = 50
+N_QUERIES = 50
+
+
+def synthetic_catalog(n_shades, seed=0):
+    """Random skin-like shades spread across brands and price points"""
+    rng = np.random.default_rng(seed)
+    rgb = rng.uniform([60, 35, 20], [250, 225, 205], (n_shades, 3)).astype(int)
+    brands = rng.integers(N_BRANDS, size=n_shades)
+    prices = rng.integers(8, 70, size=n_shades)
+    return [{'brand': f'Brand {b}', 'product': 'Foundation', 'shade': str(i), 'rgb': c.tolist(), 'price': int(p)}
+            for i, (c, b, p) in enumerate(zip(rgb, brands, prices))]
+
+
+def time_queries(fn, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    queries = np.random.default_rng(1).uniform([90, 60, 40], [240, 200, 180], (N_QUERIES, 3))
+    print(f'{"shades":>9}  {"build s":>8}  {"query":<28} {"p50 ms":>8} {"p99 ms":>8}')
+
+    for size in SIZES:
+        records = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = ShadeIndex(records)
+        build = time.perf_counter() - start
+
+        cases = {
+            'nearest k=5': lambda q: index.nearest(q, k=5),
+            'nearest k=5 brand+price': lambda q: index.nearest(q, k=5, brands=['brand_3', 'brand_7'],
+                                                               max_price=40),
+            'nearest_per_brand k=2': lambda q: index.nearest_per_brand(q, k=2)
+        }
+        for name, fn in cases.items():
+            p50, p99 = time_queries(fn, queries)
+            print(f'{size:>9}  {build:8.2f}  {name:<28} {p50:8.3f} {p99:8.3f}')
+
+
+if __name__ == '__main__':
+    main()
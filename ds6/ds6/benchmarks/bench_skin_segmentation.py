@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Throughput and selectivity of skin segmentation versus the old brightness mask.
+Run from the project directory: python benchmarks/bench_skin_segmentation.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skin_segmentation import SkinSegmenter
+
+SKIN_TONES = {
+    'light': (232, 196, 170),
+    'medium': (198, 144, 108),
+    'deep': (118, 78, 56)
+}
+REPEATS = 20
+
+
+def synthetic_face_crop(size, skin_rgb, seed=0):
+    """Face crop with background, hair, lips and eyes; returns (image, true skin mask)"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size] / size
+    image = np.empty((size, size, 3), dtype=np.float64)
+    image[:] = (90, 110, 140)                                   # background
+
+    face = ((xx - 0.5) / 0.33) ** 2 + ((yy - 0.55) / 0.42) ** 2 <= 1
+    image[face] = skin_rgb
+    hair = (yy < 0.3) & (((xx - 0.5) / 0.42) ** 2 + ((yy - 0.35) / 0.3) ** 2 <= 1)
+    image[hair] = (50, 35, 25)
+    lips = ((xx - 0.5) / 0.1) ** 2 + ((yy - 0.8) / 0.035) ** 2 <= 1
+    image[lips] = (170, 60, 75)
+    eyes = (((np.abs(xx - 0.5) - 0.13) / 0.05) ** 2 + ((yy - 0.48) / 0.025) ** 2) <= 1
+    image[eyes] = (40, 30, 30)
+
+    skin = face & ~hair & ~lips & ~eyes
+    image += rng.normal(0, 6, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8), skin
+
+
+def brightness_mask(pixels):
+    """The filter extract_dominant_skin_color used before segmentation"""
+    return np.all(pixels > [30, 30, 30], axis=1) & np.all(pixels < [250, 250, 250], axis=1)
+
+
+def timed(fn, repeats=REPEATS):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    segmenter = SkinSegmenter()
+    print(f'{"crop":>6} {"tone":<7} {"method":<11} {"Mpx/s":>8} {"kept":>7} {"precision":>10} {"recall":>7}')
+
+    for size in (256, 512, 1024):
+        for tone, rgb in SKIN_TONES.items():
+            image, truth = synthetic_face_crop(size, rgb)
+            pixels = image.reshape(-1, 3)
+            truth = truth.reshape(-1)
+
+            old, old_time = timed(lambda: brightness_mask(pixels))
+            new, new_time = timed(lambda: segmenter.mask(image).reshape(-1) > 0)
+
+            for name, mask, elapsed in (('brightness', old, old_time), ('ycrcb', new, new_time)):
+                kept = mask.mean()
+                precision = (mask & truth).sum() / max(mask.sum(), 1)
+                recall = (mask & truth).sum() / truth.sum()
+                print(f'{size:>6} {tone:<7} {name:<11} {pixels.shape[0] / elapsed / 1e6:8.1f} '
+                      f'{kept:7.1%} {precision:10.1%} {recall:7.1%}')
+
+
+if __name__ == '__main__':
+    main()
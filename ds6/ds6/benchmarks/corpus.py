@@ -0,0 +1,81 @@
+"""
+Synthetic image corpus for the ShadeFit benchmarks.
+Images are drawn locally (no downloads): a face-like figure with eyes, brows
+and mouth on a textured background, plus plain skin patches, at several
+resolutions and skin tones. Generation is deterministic per seed.
+"""
+
+import base64
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+RESOLUTIONS = {
+    'vga': (480, 640),
+    'hd': (1080, 1440),
+    '12mp': (3000, 4000)
+}
+SKIN_TONES = {
+    'light': (232, 196, 170),
+    'medium': (198, 144, 108),
+    'deep': (118, 78, 56)
+}
+
+
+def face_image(height, width, skin_rgb, seed=0):
+    """RGB uint8 image of a frontal face-like figure"""
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = rng.integers(60, 140, 3)
+
+    cx, cy = width // 2, height // 2
+    fw, fh = int(min(width, height) * 0.22), int(min(width, height) * 0.3)
+    cv2.ellipse(image, (cx, cy - fh), (int(fw * 1.1), int(fh * 0.6)), 0, 180, 360, (45, 32, 24), -1)
+    cv2.ellipse(image, (cx, cy), (fw, fh), 0, 0, 360, tuple(int(c) for c in skin_rgb), -1)
+
+    eye_dx, eye_y, eye_r = fw // 2, cy - fh // 5, max(2, fw // 8)
+    for ex in (cx - eye_dx, cx + eye_dx):
+        cv2.ellipse(image, (ex, eye_y), (eye_r * 2, eye_r), 0, 0, 360, (235, 235, 235), -1)
+        cv2.circle(image, (ex, eye_y), eye_r, (40, 30, 25), -1)
+        cv2.line(image, (ex - eye_r * 2, eye_y - eye_r * 2), (ex + eye_r * 2, eye_y - eye_r * 2),
+                 (50, 35, 28), max(1, eye_r // 2))
+    cv2.ellipse(image, (cx, cy + fh // 2), (fw // 3, max(2, fh // 12)), 0, 0, 360, (165, 70, 80), -1)
+
+    noise = rng.normal(0, 5, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def skin_patch(height, width, skin_rgb, seed=0):
+    """RGB uint8 image filled with a noisy skin tone"""
+    rng = np.random.default_rng(seed)
+    patch = rng.normal(skin_rgb, 7, (height, width, 3))
+    return np.clip(patch, 0, 255).astype(np.uint8)
+
+
+def encode_jpeg(image, quality=90):
+    buffer = BytesIO()
+    Image.fromarray(image).save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def to_data_url(jpeg_bytes):
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg_bytes).decode('ascii')
+
+
+def build_corpus(resolutions=RESOLUTIONS, tones=SKIN_TONES):
+    """List of {name, resolution, kind, jpeg, data_url} covering every combination"""
+    corpus = []
+    for res_name, (height, width) in resolutions.items():
+        for seed, (tone_name, rgb) in enumerate(tones.items()):
+            for kind, draw in (('face', face_image), ('patch', skin_patch)):
+                jpeg = encode_jpeg(draw(height, width, rgb, seed))
+                corpus.append({
+                    'name': f'{kind}-{tone_name}-{res_name}',
+                    'resolution': res_name,
+                    'kind': kind,
+                    'jpeg': jpeg,
+                    'data_url': to_data_url(jpeg)
+                })
+    return corpus
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite and regression harness for the /analyze pipeline.
+
+Times each stage separately on a synthetic corpus and measures end-to-end
+throughput through Flask's test client. Results are written as JSON; pass a
+previous run with --baseline to fail (exit 1) on regressions.
+
+Run from the project directory:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+from benchmarks.corpus import build_corpus, RESOLUTIONS  # noqa: E402
+
+STAGES = ['base64_decode', 'pil_decode', 'color_conversion', 'haar_detection', 'masking',
+          'clustering', 'categorization', 'recommendation', 'json_serialization']
+
+# Stage timings below this many milliseconds are too noisy to flag as regressions
+NOISE_FLOOR_MS = 0.05
+
+
+class StageTimer:
+    """Collects per-(stage, resolution) samples in milliseconds"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name, resolution):
+        start = time.perf_counter()
+        yield
+        self.samples[(name, resolution)].append((time.perf_counter() - start) * 1000)
+
+
+def run_stages(analyzer, item, timer):
+    """The analyze_image pipeline, one timed stage at a time"""
+    res = item['resolution']
+
+    with timer.stage('base64_decode', res):
+        raw = base64.b64decode(item['data_url'].split(',')[1])
+    with timer.stage('pil_decode', res):
+        image = analyzer.decoder.decode(raw)
+    with timer.stage('color_conversion', res):
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        scale = min(1.0, analyzer.detect_size / max(gray.shape[:2]))
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    with timer.stage('haar_detection', res):
+        faces = analyzer.face_detector.detect(gray)
+    face = tuple(int(round(v / scale)) for v in faces[0]) if len(faces) > 0 else None
+    with timer.stage('masking', res):
+        skin = analyzer.select_skin_pixels(analyzer.crop_face(image, face))
+    with timer.stage('clustering', res):
+        color = analyzer.color_engine.dominant_color(skin).astype(int)
+    with timer.stage('categorization', res):
+        analysis = analyzer.categorize_skin_tone(color)
+    with timer.stage('recommendation', res):
+        recommendations = analyzer.get_product_recommendations(analysis)
+    with timer.stage('json_serialization', res):
+        json.dumps({'success': True, 'analysis': analysis, 'recommendations': recommendations})
+
+    return face is not None
+
+
+def summarize(samples):
+    samples = np.array(samples)
+    return {
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p90_ms': round(float(np.percentile(samples, 90)), 4),
+        'mean_ms': round(float(samples.mean()), 4),
+        'n': int(len(samples))
+    }
+
+
+def benchmark_stages(analyzer, corpus, repeat):
+    timer = StageTimer()
+    faces_found = 0
+    for item in corpus:
+        run_stages(analyzer, item, timer)    # warm-up
+        for _ in range(repeat):
+            faces_found += run_stages(analyzer, item, timer)
+
+    stages = {}
+    for name in STAGES:
+        stages[name] = {res: summarize(timer.samples[(name, res)])
+                        for res in RESOLUTIONS if (name, res) in timer.samples}
+    return stages, faces_found / (len(corpus) * repeat)
+
+
+def benchmark_end_to_end(app_module, corpus, repeat):
+    """Images/sec through POST /analyze with the result cache bypassed"""
+    client = app_module.app.test_client()
+    analyzer = app_module.get_analyzer()
+    cache, analyzer.cache = analyzer.cache, None
+    try:
+        results = {}
+        for res in RESOLUTIONS:
+            items = [item for item in corpus if item['resolution'] == res]
+            if not items:
+                continue
+            client.post('/analyze', json={'image': items[0]['data_url']})
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for item in items:
+                    t = time.perf_counter()
+                    response = client.post('/analyze', json={'image': item['data_url']})
+                    latencies.append((time.perf_counter() - t) * 1000)
+                    assert response.get_json()['success'], response.get_json()
+            elapsed = time.perf_counter() - start
+            results[res] = dict(summarize(latencies), images_per_sec=round(len(latencies) / elapsed, 2))
+        return results
+    finally:
+        analyzer.cache = cache
+
+
+def compare(current, baseline, threshold):
+    """List of human-readable regressions of current against baseline"""
+    regressions = []
+    for stage, by_res in current['stages'].items():
+        for res, stats in by_res.items():
+            base = baseline.get('stages', {}).get(stage, {}).get(res)
+            if base is None:
+                continue
+            limit = max(base['p50_ms'] * (1 + threshold), base['p50_ms'] + NOISE_FLOOR_MS)
+            if stats['p50_ms'] > limit:
+                regressions.append(f"{stage}[{res}] p50 {base['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms")
+
+    for res, stats in current['end_to_end'].items():
+        base = baseline.get('end_to_end', {}).get(res)
+        if base is not None and stats['images_per_sec'] < base['images_per_sec'] / (1 + threshold):
+            regressions.append(f"end_to_end[{res}] {base['images_per_sec']:.2f} -> "
+                               f"{stats['images_per_sec']:.2f} images/sec")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write results')
+    parser.add_argument('--baseline', help='previous results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown before a stage counts as regressed (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per corpus image')
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    args = parser.parse_args()
+
+    import app as app_module
+    from skin_analyzer import ANALYZER_VERSION
+
+    corpus = build_corpus({r: RESOLUTIONS[r] for r in args.resolutions})
+    analyzer = app_module.get_analyzer()
+    stages, face_rate = benchmark_stages(analyzer, corpus, args.repeat)
+    end_to_end = benchmark_end_to_end(app_module, corpus, args.repeat)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'analyzer_version': ANALYZER_VERSION,
+            'color_engine': analyzer.color_engine.name,
+            'repeat': args.repeat,
+            'face_detection_rate': round(face_rate, 3)
+        },
+        'stages': stages,
+        'end_to_end': end_to_end
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f'{"stage":<20}' + ''.join(f'{res + " p50 ms":>16}' for res in args.resolutions))
+    for name in STAGES:
+        print(f'{name:<20}' + ''.join(f'{stages[name][res]["p50_ms"]:>16.3f}' for res in args.resolutions))
+    print(f'{"end-to-end img/s":<20}' + ''.join(f'{end_to_end[res]["images_per_sec"]:>16.2f}'
+                                               for res in args.resolutions))
+    print(f'\nResults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f'\nRegressions beyond {args.threshold:.0%}:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Vectorized color science for ShadeFit.
+Conversions take arrays of shape (..., 3) with 0-255 sRGB values and work on a
+single color or a whole image alike; the classifiers return one label per color.
+"""
+
+import numpy as np
+
+# sRGB (D65) to CIE XYZ
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def srgb_to_linear(rgb):
+    """Undo the sRGB transfer curve, returning linear values in 0-1"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+def rgb_to_xyz(rgb):
+    return srgb_to_linear(rgb) @ _RGB_TO_XYZ.T
+
+
+def rgb_to_lab(rgb):
+    """sRGB to CIELAB (D65 white point)"""
+    xyz = rgb_to_xyz(rgb) / _D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    l = 116 * f[..., 1] - 16
+    a = 500 * (f[..., 0] - f[..., 1])
+    b = 200 * (f[..., 1] - f[..., 2])
+    return np.stack([l, a, b], axis=-1)
+
+
+def lab_to_rgb(lab):
+    """CIELAB (D65) back to 0-255 sRGB floats"""
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack([fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200], axis=-1)
+    xyz = np.where(f > 6 / 29, f ** 3, 3 * (6 / 29) ** 2 * (f - 4 / 29)) * _D65_WHITE
+    linear = np.clip(xyz @ np.linalg.inv(_RGB_TO_XYZ).T, 0, 1)
+    c = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+    return c * 255.0
+
+
+def _hue(rgb, max_val, diff):
+    """Hue in 0-1 shared by HSV and HSL, 0 for greys (as colorsys does)"""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    safe = np.where(diff == 0, 1, diff)
+    h = np.where(max_val == r, (g - b) / safe % 6,
+                 np.where(max_val == g, (b - r) / safe + 2, (r - g) / safe + 4))
+    return np.where(diff == 0, 0.0, h / 6)
+
+
+def rgb_to_hsv(rgb):
+    """sRGB to HSV with every component in 0-1"""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    max_val = rgb.max(axis=-1)
+    diff = max_val - rgb.min(axis=-1)
+    s = np.where(max_val == 0, 0.0, diff / np.where(max_val == 0, 1, max_val))
+    return np.stack([_hue(rgb, max_val, diff), s, max_val], axis=-1)
+
+
+def hsv_to_rgb(hsv):
+    hsv = np.asarray(hsv, dtype=np.float64)
+    h, s, v = hsv[..., 0] * 6, hsv[..., 1], hsv[..., 2]
+    k = (np.array([5, 3, 1]) + h[..., None]) % 6
+    rgb = v[..., None] - v[..., None] * s[..., None] * np.clip(np.minimum(k, 4 - k), 0, 1)
+    return rgb * 255.0
+
+
+def rgb_to_hsl(rgb):
+    """sRGB to HSL as (degrees, percent, percent), rounded like the scalar helper"""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    max_val = rgb.max(axis=-1)
+    min_val = rgb.min(axis=-1)
+    diff = max_val - min_val
+    l = (max_val + min_val) / 2
+    denom = np.where(l > 0.5, 2 - max_val - min_val, max_val + min_val)
+    s = np.where(diff == 0, 0.0, diff / np.where(denom == 0, 1, denom))
+    return np.stack([np.round(_hue(rgb, max_val, diff) * 360), np.round(s * 100), np.round(l * 100)],
+                    axis=-1).astype(int)
+
+
+def hsl_to_rgb(hsl):
+    """(degrees, percent, percent) HSL back to 0-255 sRGB floats"""
+    hsl = np.asarray(hsl, dtype=np.float64)
+    h, s, l = hsl[..., 0] / 30, hsl[..., 1] / 100, hsl[..., 2] / 100
+    k = (np.array([0, 8, 4]) + h[..., None]) % 12
+    a = (s * np.minimum(l, 1 - l))[..., None]
+    rgb = l[..., None] - a * np.clip(np.minimum(k - 3, 9 - k), -1, 1)
+    return rgb * 255.0
+
+
+def rgb_to_ycrcb(rgb):
+    """sRGB to full-range YCrCb (ITU-R BT.601, as OpenCV's COLOR_RGB2YCrCb)"""
+    rgb = np.asarray(rgb, dtype=np.float64)
+    y = rgb @ np.array([0.299, 0.587, 0.114])
+    cr = (rgb[..., 0] - y) * 0.713 + 128
+    cb = (rgb[..., 2] - y) * 0.564 + 128
+    return np.stack([y, cr, cb], axis=-1)
+
+
+def ycrcb_to_rgb(ycrcb):
+    ycrcb = np.asarray(ycrcb, dtype=np.float64)
+    y, cr, cb = ycrcb[..., 0], ycrcb[..., 1] - 128, ycrcb[..., 2] - 128
+    return np.stack([y + 1.403 * cr, y - 0.714 * cr - 0.344 * cb, y + 1.773 * cb], axis=-1)
+
+
+UNDERTONE_LABELS = np.array(['warm', 'cool', 'neutral'])
+
+
+def undertone_codes(rgb):
+    """Index into UNDERTONE_LABELS per color: hue bands first, then RGB dominance"""
+    rgb = np.asarray(rgb, dtype=np.float64)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    hue = rgb_to_hsv(rgb)[..., 0] * 360
+
+    warm = ((hue >= 15) & (hue <= 45)) | ((r > g) & (r > b))
+    cool = ((hue >= 200) & (hue <= 260)) | ((b > r) & (b > g))
+    # Hue bands take precedence over the RGB ratio checks
+    cool &= ~((hue >= 15) & (hue <= 45))
+    warm &= ~((hue >= 200) & (hue <= 260))
+    return np.where(warm, 0, np.where(cool, 1, 2))
+
+
+def classify_undertone(rgb):
+    """Undertone label per color"""
+    return UNDERTONE_LABELS[undertone_codes(rgb)]
+
+
+def category_codes(rgb, categories):
+    """Index into list(categories) per color, len(categories) when no range matches"""
+    brightness = np.asarray(rgb, dtype=np.float64).sum(axis=-1) / 3
+    names = list(categories)
+    index = np.full(brightness.shape, len(names))
+    # Assign in reverse so earlier categories take precedence on shared bounds
+    for i in reversed(range(len(names))):
+        low, high = categories[names[i]]['range']
+        index = np.where((brightness >= low) & (brightness <= high), i, index)
+    return index
+
+
+def classify_category(rgb, categories, default='medium'):
+    """Brightness category per color; the first range containing the brightness wins"""
+    labels = np.array(list(categories) + [default])
+    return labels[category_codes(rgb, categories)]
+
+
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return [int(hex_color[i:i + 2], 16) for i in (0, 2, 4)]
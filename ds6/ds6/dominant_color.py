@@ -0,0 +1,408 @@
+"""
+Dominant color engines for ShadeFit.
+Each engine takes an (N, 3) array of skin pixels and returns the center of the
+most populated color cluster, matching what SkinToneAnalyzer used to get from
+a full sklearn KMeans run.
+"""
+
+import numpy as np
+
+# How much accuracy each preset trades for speed
+QUALITY_PRESETS = {
+    'fast': {'sample_size': 2000, 'max_iter': 10, 'n_init': 1, 'bits': 4},
+    'balanced': {'sample_size': 8000, 'max_iter': 20, 'n_init': 2, 'bits': 5},
+    'accurate': {'sample_size': 30000, 'max_iter': 50, 'n_init': 3, 'bits': 6}
+}
+
+
+# fit_many clusters groups together in batches of at most this many (padded)
+# points, which keeps each batch's working set in cache
+BATCH_POINTS = 16384
+
+
+def largest_cluster_center(centers, labels, weights=None):
+    """Return the center of the cluster with the most members"""
+    counts = np.bincount(labels, weights=weights, minlength=len(centers))
+    return centers[np.argmax(counts)]
+
+
+def _nearest(channels, centers):
+    """Index of, and squared distance to, the nearest center for every point
+
+    channels holds one contiguous (..., S) array per color channel and centers is
+    (..., K, C). Distances are built one cluster at a time on contiguous rows and
+    compared as they go, which is much faster than reducing over short trailing
+    axes; ties go to the lower index, as with argmin.
+    """
+    for k in range(centers.shape[-2]):
+        dist = (channels[0] - centers[..., k, 0, None]) ** 2
+        for c in range(1, len(channels)):
+            dist += (channels[c] - centers[..., k, c, None]) ** 2
+        if k == 0:
+            best, labels = dist, np.zeros(dist.shape, dtype=np.intp)
+        else:
+            closer = dist < best
+            labels[closer] = k
+            np.minimum(best, dist, out=best)
+    return labels, best
+
+
+def _lloyd(data, centers, max_iter, tol, weights=None):
+    """Vectorized (optionally weighted) k-means iterations from the given centers"""
+    n_clusters = len(centers)
+    if weights is None:
+        weights = np.ones(len(data), dtype=data.dtype)
+    channels = [np.ascontiguousarray(data[:, c]) for c in range(data.shape[1])]
+    # bincount works in float64; convert the per-iteration weights once up front
+    weighted = [(weights * channel).astype(np.float64) for channel in channels]
+    weights64 = weights.astype(np.float64)
+
+    for _ in range(max_iter):
+        labels, _ = _nearest(channels, centers)
+        counts = np.bincount(labels, weights=weights64, minlength=n_clusters)
+        sums = np.stack([np.bincount(labels, weights=w, minlength=n_clusters) for w in weighted], axis=1)
+        # Empty clusters keep their previous center
+        nonempty = counts > 0
+        new_centers = centers.copy()
+        new_centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+        shift = np.abs(new_centers - centers).max()
+        centers = new_centers
+        if shift <= tol:
+            break
+
+    labels, dist = _nearest(channels, centers)
+    inertia = float((dist * weights).sum())
+    return centers, labels, inertia
+
+
+def _lloyd_many(data, weights, centers, max_iter, tol):
+    """_lloyd over G zero-padded groups at once
+
+    data is (G, S, 3), weights (G, S) with 0 for padding and centers (G, K, 3).
+    Each iteration only touches groups that have not converged yet, so the
+    result matches G separate _lloyd runs.
+    """
+    n_clusters = centers.shape[1]
+    channels = [np.ascontiguousarray(data[..., c]) for c in range(data.shape[2])]
+    weighted = [(weights * channel).astype(np.float64) for channel in channels]
+    weights64 = weights.astype(np.float64)
+    centers = centers.copy()
+    active = np.arange(len(centers))
+
+    for _ in range(max_iter):
+        if len(active) == len(centers):
+            group_channels, group_weighted, group_weights = channels, weighted, weights64
+        else:
+            group_channels = [channel[active] for channel in channels]
+            group_weighted = [w[active] for w in weighted]
+            group_weights = weights64[active]
+        group_centers = centers[active]
+
+        labels, _ = _nearest(group_channels, group_centers)
+        flat = (labels + (np.arange(len(active)) * n_clusters)[:, None]).ravel()
+        size = len(active) * n_clusters
+        counts = np.bincount(flat, weights=group_weights.ravel(), minlength=size)
+        sums = np.stack([np.bincount(flat, weights=w.ravel(), minlength=size) for w in group_weighted], axis=1)
+        counts = counts.reshape(len(active), n_clusters)
+        sums = sums.reshape(len(active), n_clusters, -1)
+
+        # Empty clusters keep their previous center
+        nonempty = counts > 0
+        new_centers = group_centers.copy()
+        new_centers[nonempty] = sums[nonempty] / counts[nonempty][:, None]
+        shift = np.abs(new_centers - group_centers).max(axis=(1, 2))
+        centers[active] = new_centers
+        active = active[shift > tol]
+        if len(active) == 0:
+            break
+
+    labels, dist = _nearest(channels, centers)
+    inertia = (dist * weights).sum(axis=1)
+    return centers, labels, inertia
+
+
+class KMeansEngine:
+    """Reference engine: sklearn KMeans over every pixel with several restarts"""
+
+    name = 'kmeans'
+
+    def __init__(self, n_clusters=3, random_state=42, **_):
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        # Always the original 10 restarts; quality presets don't apply to the reference
+        self.n_init = 10
+
+    def dominant_color(self, pixels):
+        from sklearn.cluster import KMeans
+
+        kmeans = KMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=self.n_init)
+        kmeans.fit(pixels)
+        return largest_cluster_center(kmeans.cluster_centers_, kmeans.labels_)
+
+    def dominant_colors(self, pixel_groups):
+        return np.array([self.dominant_color(pixels) for pixels in pixel_groups])
+
+
+class MiniBatchEngine:
+    """Deterministic subsample followed by a few vectorized k-means runs"""
+
+    name = 'minibatch'
+
+    def __init__(self, n_clusters=3, random_state=42, sample_size=8000, max_iter=20, n_init=2,
+                 tol=0.5, **_):
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.sample_size = sample_size
+        self.max_iter = max_iter
+        self.n_init = n_init
+        self.tol = tol
+
+    def _sample(self, pixels, rng):
+        """Pick a fixed-size random subset so cost no longer grows with image size"""
+        if len(pixels) <= self.sample_size:
+            return pixels.astype(np.float32)
+        idx = rng.choice(len(pixels), self.sample_size, replace=False)
+        return pixels[idx].astype(np.float32)
+
+    def _init_centers(self, data, rng):
+        """k-means++ seeding"""
+        centers = np.empty((self.n_clusters, data.shape[1]), dtype=np.float32)
+        centers[0] = data[rng.integers(len(data))]
+        dist = np.sum((data - centers[0]) ** 2, axis=1)
+        for i in range(1, self.n_clusters):
+            total = dist.sum()
+            if total == 0:
+                centers[i:] = centers[0]
+                break
+            centers[i] = data[rng.choice(len(data), p=dist / total)]
+            dist = np.minimum(dist, np.sum((data - centers[i]) ** 2, axis=1))
+        return centers
+
+    def fit(self, pixels, init=None):
+        """Return (centers, labels) for the sampled pixels, keeping the best of n_init runs"""
+        rng = np.random.default_rng(self.random_state)
+        data = self._sample(pixels, rng)
+        if init is not None:
+            centers, labels, _ = _lloyd(data, np.asarray(init, dtype=np.float32).copy(), self.max_iter, self.tol)
+            return centers, labels
+
+        best = None
+        for _ in range(self.n_init):
+            result = _lloyd(data, self._init_centers(data, rng), self.max_iter, self.tol)
+            if best is None or result[2] < best[2]:
+                best = result
+        return best[0], best[1]
+
+    def fit_many(self, pixel_groups, inits=None):
+        """fit() for several pixel arrays, clustered together in vectorized batches"""
+        rngs = [np.random.default_rng(self.random_state) for _ in pixel_groups]
+        samples = [self._sample(pixels, rng) for pixels, rng in zip(pixel_groups, rngs)]
+
+        results = []
+        start = 0
+        while start < len(samples):
+            # Grow the batch while its padded size stays within BATCH_POINTS
+            end, longest = start + 1, len(samples[start])
+            while end < len(samples) and max(longest, len(samples[end])) * (end + 1 - start) <= BATCH_POINTS:
+                longest = max(longest, len(samples[end]))
+                end += 1
+            batch_inits = None if inits is None else inits[start:end]
+            results.extend(self._fit_batch(samples[start:end], rngs[start:end], batch_inits))
+            start = end
+        return results
+
+    def _fit_batch(self, samples, rngs, inits):
+        # Pad every sample to the longest; padding carries zero weight
+        data = np.zeros((len(samples), max(len(s) for s in samples), 3), dtype=np.float32)
+        weights = np.zeros(data.shape[:2], dtype=np.float32)
+        for i, sample in enumerate(samples):
+            data[i, :len(sample)] = sample
+            weights[i, :len(sample)] = 1
+
+        if inits is not None:
+            centers, labels, _ = _lloyd_many(data, weights, np.asarray(inits, dtype=np.float32),
+                                             self.max_iter, self.tol)
+        else:
+            best = None
+            for _ in range(self.n_init):
+                init = np.stack([self._init_centers(sample, rng) for sample, rng in zip(samples, rngs)])
+                result = _lloyd_many(data, weights, init, self.max_iter, self.tol)
+                if best is None:
+                    best = result
+                    continue
+                better = result[2] < best[2]
+                best = (np.where(better[:, None, None], result[0], best[0]),
+                        np.where(better[:, None], result[1], best[1]),
+                        np.where(better, result[2], best[2]))
+            centers, labels, _ = best
+
+        return [(centers[i], labels[i, :len(sample)]) for i, sample in enumerate(samples)]
+
+    def dominant_color(self, pixels):
+        centers, labels = self.fit(pixels)
+        return largest_cluster_center(centers, labels)
+
+    def dominant_colors(self, pixel_groups):
+        """(G, 3) dominant colors of G pixel arrays, clustered in one batch"""
+        return np.array([largest_cluster_center(centers, labels)
+                         for centers, labels in self.fit_many(pixel_groups)])
+
+
+class HistogramEngine:
+    """Quantized color histogram, median-cut seeded and refined with weighted k-means"""
+
+    name = 'histogram'
+
+    def __init__(self, n_clusters=3, bits=5, max_iter=20, tol=0.5, **_):
+        self.n_clusters = n_clusters
+        self.bits = bits
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def _histogram(self, pixels):
+        """Return occupied quantized colors and their pixel counts"""
+        shift = 8 - self.bits
+        q = pixels.astype(np.uint32) >> shift
+        packed = (q[:, 0] << (2 * self.bits)) | (q[:, 1] << self.bits) | q[:, 2]
+        counts = np.bincount(packed, minlength=1 << (3 * self.bits))
+        occupied = np.nonzero(counts)[0]
+        mask = (1 << self.bits) - 1
+        colors = np.stack([occupied >> (2 * self.bits), (occupied >> self.bits) & mask, occupied & mask], axis=1)
+        # Bin centers back in 0-255 space
+        colors = (colors << shift).astype(np.float64) + (1 << shift) / 2.0
+        return colors, counts[occupied].astype(np.float64)
+
+    def _median_cut(self, colors, weights):
+        """Split the occupied bins into n_clusters boxes and return their mean colors"""
+        boxes = [np.arange(len(colors))]
+
+        while len(boxes) < self.n_clusters:
+            # Split the most populated box that still spans more than one bin
+            splittable = [i for i, box in enumerate(boxes) if len(box) > 1]
+            if not splittable:
+                break
+            i = max(splittable, key=lambda j: weights[boxes[j]].sum())
+            box = boxes.pop(i)
+            box_colors = colors[box]
+            channel = np.argmax(box_colors.max(axis=0) - box_colors.min(axis=0))
+            order = box[np.argsort(box_colors[:, channel], kind='stable')]
+            cumulative = np.cumsum(weights[order])
+            cut = int(np.searchsorted(cumulative, cumulative[-1] / 2.0))
+            cut = min(max(cut, 1), len(order) - 1)
+            boxes.extend([order[:cut], order[cut:]])
+
+        return np.array([np.average(colors[box], axis=0, weights=weights[box]) for box in boxes])
+
+    def dominant_color(self, pixels):
+        colors, weights = self._histogram(pixels)
+        # Median cut seeds a weighted k-means over the occupied bins only, so the
+        # refinement cost depends on the number of distinct colors, not pixels
+        centers = self._median_cut(colors, weights)
+        centers, labels, _ = _lloyd(colors, centers, self.max_iter, self.tol, weights=weights)
+        return largest_cluster_center(centers, labels, weights)
+
+    def dominant_colors(self, pixel_groups):
+        # Median cut can yield fewer than n_clusters boxes, so groups are refined one by one
+        return np.array([self.dominant_color(pixels) for pixels in pixel_groups])
+
+
+# Typical skin chroma: channel ratios to mean brightness, so priors for every
+# brightness level lie on the skin locus rather than on the grey axis
+SKIN_CHROMA = np.array([1.22, 0.98, 0.80])
+
+
+def skin_priors(categories):
+    """Prior skin colors, one per brightness category, ordered dark to light"""
+    mids = sorted((low + high) / 2 for low, high in (info['range'] for info in categories.values()))
+    return np.clip(np.outer(mids, SKIN_CHROMA), 0, 255).astype(np.float32)
+
+
+class SkinPriorEngine(MiniBatchEngine):
+    """Single k-means run seeded from skin-color priors instead of random restarts"""
+
+    name = 'prior'
+
+    def __init__(self, n_clusters=3, random_state=42, sample_size=8000, max_iter=20, tol=0.5,
+                 priors=None, **_):
+        super().__init__(n_clusters=n_clusters, random_state=random_state, sample_size=sample_size,
+                         max_iter=max_iter, n_init=1, tol=tol)
+        if priors is None:
+            priors = np.outer(np.linspace(40, 240, 6), SKIN_CHROMA)
+        self.priors = np.asarray(priors, dtype=np.float32)
+
+    def initial_centers(self, pixels):
+        """n_clusters consecutive priors centred on the prior nearest the median pixel"""
+        median = np.median(pixels[:: max(1, len(pixels) // 1000)], axis=0)
+        nearest = int(np.argmin(((self.priors - median) ** 2).sum(axis=1)))
+        start = min(max(0, nearest - self.n_clusters // 2), max(0, len(self.priors) - self.n_clusters))
+        centers = self.priors[start:start + self.n_clusters].copy()
+        # Anchor the middle center on the data so the run starts inside the cluster
+        centers[nearest - start] = median
+        return centers
+
+    def fit(self, pixels, init=None):
+        return super().fit(pixels, init=self.initial_centers(pixels) if init is None else init)
+
+    def fit_many(self, pixel_groups, inits=None):
+        if inits is None:
+            inits = [self.initial_centers(pixels) for pixels in pixel_groups]
+        return super().fit_many(pixel_groups, inits=inits)
+
+
+class IncrementalDominantColor:
+    """Running cluster centers updated as more pixels or frames arrive
+
+    By default each center is the count-weighted mean over every batch, which
+    suits one image fed in chunks. With alpha, centers are an exponential
+    moving average that follows a changing source such as video frames, and
+    the dominant color is the center of the latest batch's largest cluster.
+    """
+
+    def __init__(self, engine, alpha=None):
+        self.engine = engine
+        self.alpha = alpha
+        self.centers = None
+        self.counts = None
+
+    def update(self, pixels):
+        """Fold a new batch of pixels into the running centers and return the dominant color"""
+        if self.centers is None:
+            self.centers, labels = self.engine.fit(pixels)
+            self.counts = np.bincount(labels, minlength=len(self.centers)).astype(np.float64)
+            return self.dominant_color
+
+        centers, labels = self.engine.fit(pixels, init=self.centers)
+        batch_counts = np.bincount(labels, minlength=len(centers)).astype(np.float64)
+        if self.alpha is not None:
+            self.centers = (self.alpha * centers + (1 - self.alpha) * self.centers).astype(np.float32)
+            self.counts = batch_counts
+            return self.dominant_color
+
+        # Count-weighted running mean: each center moves by its share of new members
+        total = self.counts + batch_counts
+        weight = np.divide(batch_counts, total, out=np.zeros_like(total), where=total > 0)[:, None]
+        self.centers = ((1 - weight) * self.centers + weight * centers).astype(np.float32)
+        self.counts = total
+        return self.dominant_color
+
+    @property
+    def dominant_color(self):
+        return self.centers[np.argmax(self.counts)]
+
+
+ENGINES = {
+    KMeansEngine.name: KMeansEngine,
+    MiniBatchEngine.name: MiniBatchEngine,
+    HistogramEngine.name: HistogramEngine,
+    SkinPriorEngine.name: SkinPriorEngine
+}
+
+
+def create_engine(name='prior', quality='balanced', n_clusters=3, random_state=42, priors=None):
+    """Build a dominant color engine by name with a speed/accuracy preset"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown dominant color engine '{name}', expected one of {sorted(ENGINES)}")
+    if quality not in QUALITY_PRESETS:
+        raise ValueError(f"Unknown quality '{quality}', expected one of {sorted(QUALITY_PRESETS)}")
+    return ENGINES[name](n_clusters=n_clusters, random_state=random_state, priors=priors,
+                         **QUALITY_PRESETS[quality])
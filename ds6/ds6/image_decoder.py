@@ -0,0 +1,63 @@
+"""
+Image decode stage for ShadeFit.
+Rejects oversized uploads from the header alone and decodes straight to a
+moderate working resolution, so memory per request is bounded by the working
+resolution rather than by the camera that took the photo.
+"""
+
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import metrics
+
+REDUCE_BEFORE_CONVERT = ('L', 'LA', 'RGB', 'RGBA')
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload exceeds the decoder's pixel budget"""
+
+
+class ImageDecoder:
+    """Decode uploads to an RGB array whose longest side is at most sample_size"""
+
+    def __init__(self, max_pixels=40_000_000, sample_size=1024):
+        self.max_pixels = max_pixels
+        self.sample_size = sample_size
+
+    def decode(self, source):
+        """Decode image bytes or a binary file-like object to an RGB uint8 array"""
+        stream = BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+        image = Image.open(stream)
+
+        # Only the header has been read at this point
+        width, height = image.size
+        metrics.IMAGE_PIXELS.observe(width * height)
+        if width * height > self.max_pixels:
+            raise ImageTooLargeError(
+                f'Image is {width}x{height} ({width * height} pixels), '
+                f'limit is {self.max_pixels} pixels')
+
+        # JPEG can decode directly at 1/2, 1/4 or 1/8 scale (DCT scaling). draft picks
+        # the scale that keeps both sides at least the requested size, so ask for the
+        # image's own aspect ratio or a wide panorama stays limited by its short side
+        if image.format == 'JPEG':
+            scale = self.sample_size / max(width, height)
+            image.draft('RGB', (max(1, round(width * scale)), max(1, round(height * scale))))
+
+        # For these modes RGB conversion only drops or copies channels, so reducing
+        # first gives the same pixels without a full-size RGB copy alongside the source
+        if image.mode not in REDUCE_BEFORE_CONVERT:
+            image = image.convert('RGB')
+
+        longest = max(image.size)
+        if longest > self.sample_size:
+            factor = longest // self.sample_size
+            if factor > 1:
+                # Integer box reduction is much cheaper than resampling at full size
+                image = image.reduce(factor)
+            if max(image.size) > self.sample_size:
+                image.thumbnail((self.sample_size, self.sample_size), Image.BILINEAR)
+
+        return np.asarray(image.convert('RGB'))
@@ -0,0 +1,125 @@
+"""
+Hot-path instrumentation for ShadeFit.
+Fixed-bucket histograms and labelled counters with Prometheus text output,
+plus an optional per-thread collector for per-request stage breakdowns.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond stages up to multi-second 12 MP decodes
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PIXEL_BUCKETS = (300_000, 1_000_000, 2_000_000, 5_000_000, 12_000_000, 24_000_000, 50_000_000)
+
+_local = threading.local()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, str(labels[name])) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {value}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, str(labels[name])) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(key + (('le', str(bound)),))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+STAGE_DURATION = Histogram('shadefit_stage_duration_seconds', 'Time spent in each analysis stage',
+                           DURATION_BUCKETS, ('stage',))
+IMAGE_PIXELS = Histogram('shadefit_image_pixels', 'Pixel count of uploaded images (from the header)',
+                         PIXEL_BUCKETS)
+FACES = Counter('shadefit_face_detections_total', 'Analyses by whether a face was found', ('found',))
+ANALYSES = Counter('shadefit_analyses_total', 'Completed analyses by outcome', ('outcome',))
+ERRORS = Counter('shadefit_analysis_errors_total', 'Failed analyses by exception type', ('type',))
+
+REGISTRY = [STAGE_DURATION, IMAGE_PIXELS, FACES, ANALYSES, ERRORS]
+
+
+@contextmanager
+def timer(stage):
+    """Time a block into the stage histogram (and the active per-request collector)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0) + elapsed * 1000, 3)
+
+
+@contextmanager
+def collect_timings():
+    """Collect a per-stage millisecond breakdown for work done on this thread"""
+    previous = getattr(_local, 'timings', None)
+    _local.timings = {}
+    try:
+        yield _local.timings
+    finally:
+        _local.timings = previous
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,103 @@
+"""
+Product catalog store for ShadeFit.
+Loads the catalog once, precomputes indexes by brand, category and price
+bucket, and caches the serialized JSON body for every query it has answered.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def normalize_brand(brand):
+    """'Fenty Beauty' -> 'fenty_beauty', the form used in query strings"""
+    return brand.lower().replace(' ', '_')
+
+
+# Price bucket names accepted by /products?price_range=
+PRICE_BUCKETS = {
+    '0-25': lambda price: price <= 25,
+    '25-50': lambda price: 25 < price <= 50,
+    '50+': lambda price: price > 50
+}
+
+
+def price_bucket(price):
+    for name, contains in PRICE_BUCKETS.items():
+        if contains(price):
+            return name
+    return None
+
+
+class ProductCatalog:
+    """Indexed, read-only product catalog with cached page bodies"""
+
+    def __init__(self, path, max_cached_pages=1024):
+        self.path = path
+        with open(path, 'rb') as f:
+            raw = f.read()
+        self.products = json.loads(raw)['products']
+
+        # Version and timestamp used for ETag / Last-Modified
+        self.version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+        self.last_modified = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+
+        self.by_brand = self._index(lambda p: normalize_brand(p['brand']))
+        self.by_category = self._index(lambda p: p['category'])
+        self.by_price = self._index(lambda p: price_bucket(p['price']))
+
+        self.max_cached_pages = max_cached_pages
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, key_fn):
+        """Map each key to the sorted positions of the matching products"""
+        index = {}
+        for position, product in enumerate(self.products):
+            index.setdefault(key_fn(product), []).append(position)
+        return {key: tuple(positions) for key, positions in index.items()}
+
+    def filter(self, brand=None, category=None, price_range=None):
+        """Positions of products matching every given filter, in catalog order"""
+        selected = None
+        # Unknown price ranges are ignored, as the endpoint always did
+        filters = [(self.by_brand, brand), (self.by_category, category),
+                   (self.by_price, price_range if price_range in PRICE_BUCKETS else None)]
+        for index, value in filters:
+            if value is None:
+                continue
+            positions = index.get(value, ())
+            if selected is None:
+                selected = positions
+            else:
+                allowed = set(positions)
+                selected = tuple(p for p in selected if p in allowed)
+        return selected if selected is not None else range(len(self.products))
+
+    def page(self, brand=None, category=None, price_range=None, page=1, per_page=50):
+        """Return (json_body, etag) for one page of filtered products"""
+        key = (brand, category, price_range, page, per_page)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+
+        positions = self.filter(brand, category, price_range)
+        start = (page - 1) * per_page
+        body = json.dumps({
+            'products': [self.products[p] for p in positions[start:start + per_page]],
+            'page': page,
+            'per_page': per_page,
+            'total': len(positions)
+        })
+        etag = hashlib.blake2b(f'{self.version}:{key}'.encode(), digest_size=8).hexdigest()
+
+        with self._lock:
+            self._pages[key] = (body, etag)
+            if len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+        return body, etag
@@ -0,0 +1,216 @@
+"""
+Persistent profile store for ShadeFit.
+User profiles and past analysis results live in SQLite (WAL mode). Writes are
+queued and committed in batches by a single background writer; reads run on
+per-thread connections so their prepared statements are reused, and go
+through the primary key or the (user_id, id) index.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from serving import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_by_user ON analyses (user_id, id);
+'''
+
+UPSERT_PROFILE = 'INSERT OR REPLACE INTO profiles (user_id, data, updated) VALUES (?, ?, ?)'
+INSERT_ANALYSIS = 'INSERT INTO analyses (user_id, result, created) VALUES (?, ?, ?)'
+TRIM_HISTORY = ('DELETE FROM analyses WHERE user_id = ? AND id < '
+                '(SELECT MIN(id) FROM (SELECT id FROM analyses WHERE user_id = ? ORDER BY id DESC LIMIT ?))')
+SELECT_PROFILE = 'SELECT data, updated FROM profiles WHERE user_id = ?'
+SELECT_HISTORY = 'SELECT result, created FROM analyses WHERE user_id = ? ORDER BY id DESC LIMIT ?'
+
+
+class ProfileStore:
+    """SQLite-backed profiles and analysis history with batched background writes"""
+
+    def __init__(self, path, max_history=20, batch_size=500, queue_size=10000, put_timeout=1.0,
+                 metrics_window=1000):
+        self.path = path
+        self.max_history = max_history
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+
+        self._local = threading.local()
+        db = self._connection()
+        # WAL lets readers run while the writer commits; NORMAL sync is safe in WAL
+        # mode and only risks the last commits on power loss, not corruption
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+        db.commit()
+
+        # Writes not yet committed, so a read right after a write sees it
+        self._pending_profiles = {}
+        self._pending_analyses = {}
+        self._pending_lock = threading.Lock()
+        self._seq = 0
+
+        self.writes = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_batch = 0
+        self._commit_times = deque(maxlen=metrics_window)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._run, name='profile-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connection(self):
+        """This thread's connection; sqlite3 caches its prepared statements"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=10)
+            db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _enqueue(self, kind, user_id, payload, pending, timeout):
+        """Queue a write, waiting up to timeout (None: not at all); False if the queue stayed full"""
+        created = time.time()
+        with self._pending_lock:
+            self._seq += 1
+            seq = self._seq
+            pending[user_id] = (seq, payload, created)
+        try:
+            if timeout is None:
+                self._queue.put_nowait((kind, seq, user_id, payload, created))
+            else:
+                self._queue.put((kind, seq, user_id, payload, created), timeout=timeout)
+            return True
+        except queue.Full:
+            with self._pending_lock:
+                if pending.get(user_id, (None,))[0] == seq:
+                    del pending[user_id]
+            return False
+
+    def save_profile(self, user_id, profile):
+        """Queue a profile write; raises QueueFullError if the writer is saturated"""
+        if not self._enqueue('profile', user_id, profile, self._pending_profiles, self.put_timeout):
+            raise QueueFullError(retry_after=1)
+
+    def save_analysis(self, user_id, result):
+        """Queue an analysis result for the user's history; never blocks the request
+        
+        The analysis has already been computed, so when the queue is full the
+        history entry is dropped and counted rather than failing the response.
+        """
+        if not self._enqueue('analysis', user_id, result, self._pending_analyses, None):
+            self.dropped += 1
+
+    def get_profile(self, user_id):
+        """{'profile': ..., 'updated_at': ...} or None"""
+        with self._pending_lock:
+            pending = self._pending_profiles.get(user_id)
+        if pending is not None:
+            return {'profile': pending[1], 'updated_at': pending[2]}
+
+        row = self._connection().execute(SELECT_PROFILE, (user_id,)).fetchone()
+        if row is None:
+            return None
+        return {'profile': json.loads(row[0]), 'updated_at': row[1]}
+
+    def history(self, user_id, limit=None):
+        """Most recent analyses first, as [{'result': ..., 'analyzed_at': ...}]
+        
+        limit is clamped to 1..max_history.
+        """
+        limit = self.max_history if limit is None else max(1, min(limit, self.max_history))
+        with self._pending_lock:
+            pending = self._pending_analyses.get(user_id)
+
+        rows = self._connection().execute(SELECT_HISTORY, (user_id, limit)).fetchall()
+        entries = [{'result': json.loads(result), 'analyzed_at': created} for result, created in rows]
+        if pending is not None and (not entries or entries[0]['analyzed_at'] < pending[2]):
+            entries = [{'result': pending[1], 'analyzed_at': pending[2]}] + entries[:limit - 1]
+        return entries
+
+    def last_analysis(self, user_id):
+        """The user's latest stored analysis, or None"""
+        entries = self.history(user_id, limit=1)
+        return entries[0] if entries else None
+
+    def _run(self):
+        db = self._connection()
+        while True:
+            batch = [self._queue.get()]
+            # Group commit: everything already queued goes into the same transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            try:
+                self._write(db, batch)
+            except (sqlite3.Error, TypeError, ValueError):
+                # Keep the writer alive; the batch is lost but later writes are not
+                logger.exception('Dropped a batch of %d profile store writes', len(batch))
+                self.failed += len(batch)
+            finally:
+                self._clear_pending(batch)
+                self._commit_times.append(time.perf_counter() - start)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, db, batch):
+        profiles = [(user_id, json.dumps(payload), created)
+                    for kind, _, user_id, payload, created in batch if kind == 'profile']
+        analyses = [(user_id, json.dumps(payload), created)
+                    for kind, _, user_id, payload, created in batch if kind == 'analysis']
+        with db:
+            db.executemany(UPSERT_PROFILE, profiles)
+            db.executemany(INSERT_ANALYSIS, analyses)
+            users = {user_id for user_id, _, _ in analyses}
+            db.executemany(TRIM_HISTORY, [(user_id, user_id, self.max_history) for user_id in users])
+
+        self.writes += len(batch)
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(batch))
+
+    def _clear_pending(self, batch):
+        with self._pending_lock:
+            for kind, seq, user_id, _, _ in batch:
+                pending = self._pending_profiles if kind == 'profile' else self._pending_analyses
+                if pending.get(user_id, (None,))[0] == seq:
+                    del pending[user_id]
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self._queue.join()
+
+    def stats(self):
+        commit_times = sorted(self._commit_times)
+        return {
+            'queued': self._queue.qsize(),
+            'writes': self.writes,
+            'failed_writes': self.failed,
+            'dropped_analyses': self.dropped,
+            'batches': self.batches,
+            'avg_batch_size': round(self.writes / self.batches, 2) if self.batches else None,
+            'max_batch_size': self.max_batch,
+            'commit_ms_p50': round(commit_times[len(commit_times) // 2] * 1000, 3) if commit_times else None,
+            'max_history': self.max_history
+        }
@@ -0,0 +1,120 @@
+"""
+Response serialization for ShadeFit.
+Payloads that rarely change are serialized and compressed once, then served
+with strong ETags and content negotiation. Also provides the compact /analyze
+response schema for bandwidth-sensitive clients.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:    # optional; gzip is always available
+    brotli = None
+
+
+def dumps(payload):
+    """Compact UTF-8 JSON bytes"""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class EncodedBody:
+    """One JSON body with its ETag and precompressed variants"""
+
+    def __init__(self, body, compress_level=9):
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        # Strong ETags must differ per content-coding
+        self.variants = {'identity': (body, self.etag)}
+        self.variants['gzip'] = (gzip.compress(body, compress_level, mtime=0), self.etag + '-gzip')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=11 if compress_level >= 9 else 5),
+                                   self.etag + '-br')
+
+    def response(self, request):
+        """Negotiated (and, for a matching If-None-Match, 304) response for request"""
+        encoding = request.accept_encodings.best_match(
+            [e for e in ('br', 'gzip') if e in self.variants], default='identity')
+        body, etag = self.variants[encoding]
+
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+
+class StaticPayload(EncodedBody):
+    """A payload serialized once at startup"""
+
+    def __init__(self, payload):
+        super().__init__(dumps(payload))
+
+
+class SnapshotPayload:
+    """Serializes a periodically replaced snapshot once per snapshot, not per request
+
+    source() must return the same object until the data changes (as
+    AnalyticsPipeline.snapshot() does); build turns it into the response payload.
+    """
+
+    def __init__(self, source, build=lambda snapshot: snapshot):
+        self.source = source
+        self.build = build
+        self._snapshot = None
+        self._encoded = None
+        self._lock = threading.Lock()
+
+    def response(self, request):
+        snapshot = self.source()
+        with self._lock:
+            if snapshot is not self._snapshot:
+                # Cheaper compression: this body is rebuilt as often as once a second
+                self._encoded = EncodedBody(dumps(self.build(snapshot)), compress_level=6)
+                self._snapshot = snapshot
+            encoded = self._encoded
+        return encoded.response(request)
+
+
+def _compact_entry(entry):
+    analysis = entry['analysis']
+    compact = {
+        'category': analysis['category'],
+        'undertone': analysis['undertone'],
+        'hex': analysis['hex'],
+        'brightness': round(analysis['brightness'], 1)
+    }
+    # The vote shares cannot be recomputed from hex, so they are kept
+    if 'pixel_votes' in analysis:
+        compact['pixel_votes'] = analysis['pixel_votes']
+    return {
+        'analysis': compact,
+        'recommendations': [
+            {k: v for k, v in r.items() if k not in ('name', 'color')}
+            for r in entry['recommendations']
+        ]
+    }
+
+
+def compact_result(result):
+    """/analyze result without fields clients can derive from hex
+
+    Drops the rgb/hsl strings and dominant_color from each analysis, and the
+    name and color strings from the color suggestions.
+    """
+    if not result.get('success'):
+        return result
+
+    compact = {k: v for k, v in result.items() if k not in ('analysis', 'recommendations', 'faces', 'regions')}
+    if 'analysis' in result:
+        compact.update(_compact_entry(result))
+    if 'faces' in result:
+        compact['faces'] = [dict(_compact_entry(face), box=face['box']) for face in result['faces']]
+    if 'regions' in result:
+        compact['regions'] = {name: _compact_entry(region) for name, region in result['regions'].items()}
+    return compact
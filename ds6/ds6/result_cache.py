@@ -0,0 +1,151 @@
+"""
+Content-addressed cache of analysis results for ShadeFit.
+Entries are keyed by a hash of the uploaded image bytes and the analyzer
+config version, held in a bounded LRU with a TTL, and optionally mirrored to
+a bounded SQLite table so they survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# The on-disk table is trimmed to its TTL and row cap once every this many writes
+TRIM_EVERY = 100
+
+
+def make_key(image_bytes, config_version):
+    """Hash the image bytes together with the analyzer config version"""
+    digest = hashlib.blake2b(image_bytes, digest_size=16)
+    digest.update(config_version.encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU/TTL cache with an optional on-disk backing store"""
+
+    def __init__(self, max_entries=1024, ttl=24 * 3600, disk_path=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.disk_path = disk_path
+        self._db = None
+        if disk_path:
+            self._connect()
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_by_created ON results (created)')
+            self._trim()
+            # SQLite connections must not be shared across fork; pre-forked workers reconnect
+            os.register_at_fork(after_in_child=self._connect)
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        # Disk I/O has its own lock so memory hits never wait behind a commit
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+        self._db.execute('PRAGMA synchronous=NORMAL')
+
+    def _trim(self):
+        """Drop expired rows and the oldest rows beyond max_disk_entries (caller holds _db_lock)"""
+        if self.ttl is not None:
+            self._db.execute('DELETE FROM results WHERE created < ?', (time.time() - self.ttl,))
+        if self.max_disk_entries is not None:
+            self._db.execute('DELETE FROM results WHERE created < (SELECT created FROM results '
+                             'ORDER BY created DESC LIMIT 1 OFFSET ?)', (self.max_disk_entries - 1,))
+        self._db.commit()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._db is None:
+                self.misses += 1
+                return None
+
+        with self._db_lock:
+            row = self._db.execute('SELECT value, created FROM results WHERE key = ?', (key,)).fetchone()
+
+        with self._lock:
+            if row is not None and not self._expired(row[1]):
+                value = json.loads(row[0])
+                self._store(key, value, row[1])
+                self.disk_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Cache a result; the least recently used entry is evicted when full"""
+        created = time.time()
+        with self._lock:
+            self._store(key, value, created)
+        if self._db is None:
+            return
+
+        row = (key, json.dumps(value), created)
+        with self._db_lock:
+            self._db.execute('INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)', row)
+            self._disk_writes += 1
+            if self._disk_writes % TRIM_EVERY == 0:
+                self._trim()
+            else:
+                self._db.commit()
+
+    def _store(self, key, value, created):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_disk_entries': self.max_disk_entries if self._db is not None else None,
+                'ttl_seconds': self.ttl,
+                'disk_backed': self._db is not None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else None
+            }
@@ -4,7 +4,8 @@ ShadeFit - Complete Beauty & Fashion Platform
 Run this file to start the application
 """
 
-from app import app
+import os
+import sys
 import webbrowser
 import threading
 import time
@@ -14,7 +15,37 @@ def open_browser():
     time.sleep(1.5)
     webbrowser.open('http://localhost:5000')
 
-if __name__ == '__main__':
+def print_startup_report():
+    """One line of import/load timings, also served at /startup-stats"""
+    from app import startup_stats
+    analysis = startup_stats['analysis_load_ms']
+    print(f"Startup: app import {startup_stats['app_import_ms']} ms, analysis subsystem "
+          + (f"{analysis} ms" + (" (preloaded)" if startup_stats['preloaded'] else "")
+             if analysis is not None else "loads on first analysis"))
+
+def serve_production():
+    """Serve with waitress: many request threads, analyses capped by the analysis pool"""
+    from waitress import serve
+    from app import app
+
+    port = int(os.environ.get('PORT', 5000))
+    threads = int(os.environ.get('SHADEFIT_SERVER_THREADS', 32))
+    print(f"Starting ShadeFit (production) on port {port} with {threads} request threads")
+    print_startup_report()
+    serve(app, host='0.0.0.0', port=port, threads=threads)
+
+def main():
+    # The app is imported here, not at module level: batch workers started with
+    # spawn/forkserver re-run this script as __mp_main__, and only need batch.py
+    from app import app, preload
+    
+    if '--preload' in sys.argv:
+        preload()
+    
+    if '--production' in sys.argv:
+        serve_production()
+        return
+    
     print("Starting ShadeFit - Complete Platform...")
     print("Features included:")
     print("   - AI Skin Tone Detection with Confidence Scoring")
@@ -30,4 +61,7 @@ if __name__ == '__main__':
     threading.Thread(target=open_browser, daemon=True).start()
     
     # Start Flask app
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
+
+if __name__ == '__main__':
+    main()
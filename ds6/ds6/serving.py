@@ -0,0 +1,99 @@
+"""
+Bounded analysis executor for ShadeFit.
+CPU-heavy analyses run on a fixed-size thread pool behind a bounded queue, so
+request threads stay free for lightweight routes and overload turns into a
+fast 503 instead of an ever-growing backlog.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when the analysis queue is saturated"""
+
+    def __init__(self, retry_after):
+        super().__init__('Analysis queue is full, retry later')
+        self.retry_after = retry_after
+
+
+class AnalysisExecutor:
+    """Thread pool with a configurable queue depth and wait-time metrics"""
+
+    def __init__(self, workers=4, queue_depth=16, metrics_window=1000):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis')
+        # Admits running + queued jobs; anything beyond is rejected up front
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_times = deque(maxlen=metrics_window)
+        self._service_times = deque(maxlen=metrics_window)
+
+    def _retry_after(self):
+        """Seconds until a slot is likely to free up, from recent service times"""
+        with self._lock:
+            service = sum(self._service_times) / len(self._service_times) if self._service_times else 1.0
+            backlog = self.queued + self.running
+        return max(1, math.ceil(service * backlog / self.workers))
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for the result, or raise QueueFullError"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(self._retry_after())
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._wait_times.append(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self._service_times.append(time.perf_counter() - started)
+                self._slots.release()
+
+        return self._pool.submit(job).result()
+
+    def stats(self):
+        # NumPy is imported here so the executor can be created before the analysis subsystem loads
+        import numpy as np
+
+        with self._lock:
+            waits = np.array(self._wait_times) * 1000 if self._wait_times else None
+            services = np.array(self._service_times) * 1000 if self._service_times else None
+            stats = {
+                'workers': self.workers,
+                'queue_depth_limit': self.queue_depth,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'wait_ms_p50': None,
+                'wait_ms_p99': None,
+                'service_ms_p50': None
+            }
+        if waits is not None:
+            stats['wait_ms_p50'] = round(float(np.percentile(waits, 50)), 3)
+            stats['wait_ms_p99'] = round(float(np.percentile(waits, 99)), 3)
+        if services is not None:
+            stats['service_ms_p50'] = round(float(np.percentile(services, 50)), 3)
+        return stats
@@ -0,0 +1,143 @@
+"""
+Shade index for ShadeFit.
+Stores every foundation shade's measured color in CIELAB, packed into NumPy
+arrays grouped by brand, and answers k-nearest Delta E queries with brand and
+price filters in a single vectorized pass.
+"""
+
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from color_science import rgb_to_lab, hex_to_rgb
+from product_catalog import normalize_brand
+
+
+class ShadeIndex:
+    """Packed Lab array of shades with nearest-color lookup"""
+
+    def __init__(self, records):
+        # Sort by brand so each brand is a contiguous slice of the arrays
+        records = sorted(records, key=lambda r: normalize_brand(r['brand']))
+        self.records = records
+        # Content hash of the catalog, so cached recommendations follow catalog edits
+        self.version = hashlib.blake2b(json.dumps(records, sort_keys=True).encode(),
+                                       digest_size=8).hexdigest()
+
+        rgb = np.array([r['rgb'] if 'rgb' in r else hex_to_rgb(r['hex']) for r in records],
+                       dtype=np.float64).reshape(-1, 3)
+        self.lab = rgb_to_lab(rgb).astype(np.float32)
+        self.price = np.array([r.get('price', np.nan) for r in records], dtype=np.float32)
+
+        brand_keys = [normalize_brand(r['brand']) for r in records]
+        self.brands = {}
+        for i, key in enumerate(brand_keys):
+            start, _ = self.brands.get(key, (i, i))
+            self.brands[key] = (start, i + 1)
+
+        self.query_count = 0
+        self.query_time = 0.0
+
+    @classmethod
+    def from_json(cls, path):
+        """Load a catalog file of the form {"shades": [{brand, product, shade, hex, price}, ...]}"""
+        with open(path, 'r') as f:
+            return cls(json.load(f)['shades'])
+
+    def __len__(self):
+        return len(self.records)
+
+    def _distances(self, lab, start=0, stop=None):
+        """Squared CIE76 Delta E from lab to every shade in [start, stop)"""
+        # The square root is only taken for the k results that are returned
+        diff = self.lab[start:stop] - lab
+        return np.einsum('ij,ij->i', diff, diff)
+
+    def _price_mask(self, start, stop, min_price, max_price):
+        mask = None
+        if min_price is not None:
+            mask = self.price[start:stop] >= min_price
+        if max_price is not None:
+            upper = self.price[start:stop] <= max_price
+            mask = upper if mask is None else mask & upper
+        return mask
+
+    def _top_k(self, distances, k, offset):
+        """Indices (into the full arrays) of the k smallest distances, nearest first"""
+        if len(distances) > k:
+            part = np.argpartition(distances, k)[:k]
+        else:
+            part = np.arange(len(distances))
+        order = part[np.argsort(distances[part], kind='stable')]
+        return order + offset, distances[order]
+
+    def _result(self, index, distance):
+        record = dict(self.records[index])
+        record['delta_e'] = round(float(np.sqrt(distance)), 2)
+        return record
+
+    def nearest(self, rgb, k=5, brands=None, min_price=None, max_price=None):
+        """k nearest shades to an RGB color across the (filtered) catalog"""
+        if k < 1:
+            raise ValueError(f'k must be at least 1, got {k}')
+        start_time = time.perf_counter()
+        lab = rgb_to_lab(np.asarray(rgb, dtype=np.float64)).astype(np.float32)
+
+        if brands:
+            slices = [self.brands[b] for b in brands if b in self.brands]
+        else:
+            slices = [(0, len(self))]
+        candidates, distances = [], []
+        for start, stop in slices:
+            dist = self._distances(lab, start, stop)
+            mask = self._price_mask(start, stop, min_price, max_price)
+            idx = np.arange(start, stop)
+            if mask is not None:
+                dist, idx = dist[mask], idx[mask]
+            candidates.append(idx)
+            distances.append(dist)
+
+        results = []
+        if candidates:
+            idx = np.concatenate(candidates)
+            dist = np.concatenate(distances)
+            order, ordered = self._top_k(dist, k, 0)
+            results = [self._result(i, d) for i, d in zip(idx[order], ordered)]
+
+        self._record_query(start_time)
+        return results
+
+    def nearest_per_brand(self, rgb, k=2, min_price=None, max_price=None):
+        """k nearest shades from every brand, as {brand_key: [shades]}"""
+        if k < 1:
+            raise ValueError(f'k must be at least 1, got {k}')
+        start_time = time.perf_counter()
+        lab = rgb_to_lab(np.asarray(rgb, dtype=np.float64)).astype(np.float32)
+
+        results = {}
+        for brand, (start, stop) in self.brands.items():
+            dist = self._distances(lab, start, stop)
+            mask = self._price_mask(start, stop, min_price, max_price)
+            if mask is not None:
+                dist = np.where(mask, dist, np.inf)
+            order, ordered = self._top_k(dist, k, start)
+            shades = [self._result(i, d) for i, d in zip(order, ordered) if np.isfinite(d)]
+            if shades:
+                results[brand] = shades
+
+        self._record_query(start_time)
+        return results
+
+    def _record_query(self, start_time):
+        self.query_count += 1
+        self.query_time += time.perf_counter() - start_time
+
+    def stats(self):
+        return {
+            'shades': len(self),
+            'brands': len(self.brands),
+            'queries': self.query_count,
+            'query_ms_avg': round(self.query_time / self.query_count * 1000, 3) if self.query_count else None
+        }
@@ -0,0 +1,388 @@
+"""
+Skin tone analysis pipeline for ShadeFit.
+Decode, face detection, skin segmentation, dominant color clustering and
+shade matching for one image. This is the module that pulls in OpenCV, NumPy
+and PIL, so the web app imports it only when an analysis is first needed.
+"""
+
+import base64
+import logging
+import os
+
+import cv2
+import numpy as np
+
+import metrics
+from color_science import (rgb_to_hsl, classify_category, classify_undertone,
+                           category_codes, undertone_codes, UNDERTONE_LABELS)
+from dominant_color import create_engine, skin_priors
+from face_detector import FaceDetectorPool
+from image_decoder import ImageDecoder
+from result_cache import make_key
+from shade_index import ShadeIndex
+from skin_segmentation import SkinSegmenter
+from skin_tones import SKIN_TONE_CATEGORIES, category_label
+
+logger = logging.getLogger(__name__)
+
+# Pixels classified per crop for the analysis 'pixel_votes'
+VOTE_SAMPLE = 10000
+
+# Bump when analysis output changes so cached results are not reused
+ANALYZER_VERSION = 6
+
+# 'single' analyzes the first face; 'faces' every detected face; 'regions' the
+# forehead, cheeks and jaw of the first face
+ANALYSIS_MODES = ('single', 'faces', 'regions')
+
+# Sub-regions as (x0, y0, x1, y1) fractions of a Haar face box; left and right
+# are as seen in the image
+FACE_REGIONS = {
+    'forehead': (0.25, 0.05, 0.75, 0.25),
+    'left_cheek': (0.15, 0.5, 0.4, 0.75),
+    'right_cheek': (0.6, 0.5, 0.85, 0.75),
+    'jaw': (0.3, 0.82, 0.7, 1.0)
+}
+
+DEFAULT_SHADE_CATALOG = os.environ.get(
+    'SHADEFIT_SHADE_CATALOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'shades.json')
+)
+
+
+class SkinToneAnalyzer:
+    def __init__(self, face_detector=None, color_engine='prior', color_quality='balanced',
+                 max_pixels=40_000_000, sample_size=1024, detect_size=480, cache=None,
+                 shade_index=None, max_faces=10):
+        # Shared detector pool; the cascade is loaded once, not per request
+        self.face_detector = face_detector or FaceDetectorPool()
+
+        # Uploads are decoded to at most sample_size px per side for color sampling,
+        # and face detection runs on a further downscaled copy of detect_size px
+        self.decoder = ImageDecoder(max_pixels=max_pixels, sample_size=sample_size)
+        self.detect_size = detect_size
+        # Faces analyzed per image in 'faces' mode
+        self.max_faces = max_faces
+
+        # Skin segmentation ahead of clustering
+        self.segmenter = SkinSegmenter()
+
+        # Optional result cache keyed by image bytes + config_version
+        self.cache = cache
+
+        self.skin_tone_categories = {name: dict(c) for name, c in SKIN_TONE_CATEGORIES.items()}
+
+        # Dominant color engine ('prior', 'minibatch', 'histogram' or 'kmeans'),
+        # seeded from skin colors derived from the category ranges
+        self.color_engine = create_engine(color_engine, color_quality,
+                                          priors=skin_priors(self.skin_tone_categories))
+        
+        # Foundation shades indexed by measured Lab color
+        self.shade_index = shade_index or ShadeIndex.from_json(DEFAULT_SHADE_CATALOG)
+
+        # The shade catalog's hash is part of it: recommendations come from the catalog
+        self.config_version = (f'v{ANALYZER_VERSION}:{color_engine}:{color_quality}:'
+                               f'{max_pixels}:{sample_size}:{detect_size}:{self.shade_index.version}')
+
+    def analyze_image(self, image_data, mode='single'):
+        """Analyze skin tone from base64 image data"""
+        try:
+            # Decode base64 image
+            with metrics.timer('base64_decode'):
+                image_bytes = base64.b64decode(image_data.split(',')[1])
+        except Exception as e:
+            metrics.ERRORS.inc(type=type(e).__name__)
+            return {'success': False, 'error': str(e)}
+        
+        return self.analyze_file(image_bytes, mode)
+
+    def analyze_file(self, source, mode='single'):
+        """Analyze skin tone from raw image bytes or a binary file-like object"""
+        if mode not in ANALYSIS_MODES:
+            return {'success': False, 'error': f"Unknown analysis mode '{mode}', expected one of {list(ANALYSIS_MODES)}"}
+        
+        if self.cache is None:
+            return self._analyze(source, mode)
+        
+        # Identical uploads skip the pipeline entirely
+        image_bytes = source if isinstance(source, (bytes, bytearray)) else source.read()
+        config_version = self.config_version if mode == 'single' else f'{self.config_version}:{mode}:{self.max_faces}'
+        with metrics.timer('cache_lookup'):
+            key = make_key(image_bytes, config_version)
+            result = self.cache.get(key)
+        if result is None:
+            result = self._analyze(image_bytes, mode)
+            if result['success']:
+                self.cache.put(key, result)
+        return result
+
+    def _analyze(self, source, mode='single'):
+        """Run decode, detection, clustering and recommendation on one image"""
+        try:
+            # Decode to an RGB array at working resolution (rejects oversized images)
+            with metrics.timer('decode'):
+                image_np = self.decoder.decode(source)
+            
+            if mode != 'single':
+                result = self.analyze_faces(image_np, regions=(mode == 'regions'))
+                metrics.ANALYSES.inc(outcome='success')
+                return result
+            
+            # Extract skin tone
+            skin_pixels = self.face_skin_pixels(image_np)
+            with metrics.timer('clustering'):
+                skin_color = self.color_engine.dominant_color(skin_pixels).astype(int)
+            
+            # Analyze undertones and category, plus how the individual skin pixels vote
+            with metrics.timer('categorization'):
+                analysis = self.categorize_skin_tone(skin_color)
+                analysis['pixel_votes'] = self.classify_pixels(skin_pixels)
+            
+            # Get product recommendations
+            with metrics.timer('recommendation'):
+                recommendations = self.get_product_recommendations(analysis)
+            
+            metrics.ANALYSES.inc(outcome='success')
+            return {
+                'success': True,
+                'analysis': analysis,
+                'recommendations': recommendations
+            }
+            
+        except Exception as e:
+            # The client only sees the message; keep the stage and traceback in the logs
+            logger.warning('Analysis failed: %s', e, exc_info=True)
+            metrics.ANALYSES.inc(outcome='error')
+            metrics.ERRORS.inc(type=type(e).__name__)
+            return {'success': False, 'error': str(e)}
+
+    def face_skin_pixels(self, image):
+        """Skin pixels of the first detected face, or of the center region if none was found"""
+        # Detect faces on a downscaled grayscale copy
+        with metrics.timer('detection'):
+            faces = self.detect_faces(image)
+        metrics.FACES.inc(found='true' if len(faces) > 0 else 'false')
+        
+        with metrics.timer('masking'):
+            face_region = self.crop_face(image, faces[0] if len(faces) > 0 else None)
+            return self.select_skin_pixels(face_region)
+
+    def extract_dominant_skin_color(self, image):
+        """Extract dominant skin color using face detection and color clustering"""
+        skin_pixels = self.face_skin_pixels(image)
+        
+        # Cluster skin pixels and take the most frequent cluster (dominant color)
+        with metrics.timer('clustering'):
+            dominant_color = self.color_engine.dominant_color(skin_pixels)
+        
+        return dominant_color.astype(int)
+
+    def analyze_faces(self, image, regions=False):
+        """Every detected face, or sub-regions of the first face, from one detection pass
+        
+        All faces (or regions) are clustered together in one batched run of the
+        color engine, so N faces cost much less than N single analyses.
+        """
+        with metrics.timer('detection'):
+            faces = self.detect_faces(image)
+        metrics.FACES.inc(found='true' if len(faces) > 0 else 'false')
+        
+        with metrics.timer('masking'):
+            if regions:
+                face = faces[0] if len(faces) > 0 else None
+                box = face if face is not None else self.center_box(image)
+                # The whole face first, as in single mode, then each region
+                crops = [self.crop_face(image, face)] + list(self.crop_regions(image, box).values())
+            else:
+                boxes = faces[:self.max_faces] or [None]
+                crops = [self.crop_face(image, face) for face in boxes]
+            pixel_groups = [self.select_skin_pixels(crop) for crop in crops]
+        
+        with metrics.timer('clustering'):
+            colors = self.color_engine.dominant_colors(pixel_groups).astype(int)
+        with metrics.timer('categorization'):
+            analyses = [dict(self.categorize_skin_tone(color), pixel_votes=self.classify_pixels(pixels))
+                        for color, pixels in zip(colors, pixel_groups)]
+        with metrics.timer('recommendation'):
+            entries = [{'analysis': analysis, 'recommendations': self.get_product_recommendations(analysis)}
+                       for analysis in analyses]
+        
+        if regions:
+            return dict(entries[0], success=True, mode='regions', face_found=face is not None,
+                        box=[int(v) for v in box], regions=dict(zip(FACE_REGIONS, entries[1:])))
+        return {
+            'success': True,
+            'mode': 'faces',
+            'face_count': len(faces),
+            'faces': [dict(entry, box=[int(v) for v in face] if face is not None else None)
+                      for face, entry in zip(boxes, entries)]
+        }
+
+    def center_box(self, image):
+        """(x, y, w, h) of the center region used when no face is found"""
+        h, w = image.shape[:2]
+        region_size = min(w, h) // 3
+        return (w//2 - region_size//2, h//2 - region_size//2, region_size//2 * 2, region_size//2 * 2)
+
+    def crop_regions(self, image, box):
+        """Forehead, cheek and jaw crops of an (x, y, w, h) face box, keyed as FACE_REGIONS"""
+        x, y, w, h = box
+        crops = {}
+        for name, (fx0, fy0, fx1, fy1) in FACE_REGIONS.items():
+            x0, y0 = x + int(fx0 * w), y + int(fy0 * h)
+            x1, y1 = max(x0 + 1, x + int(fx1 * w)), max(y0 + 1, y + int(fy1 * h))
+            crops[name] = image[max(0, y0):min(image.shape[0], y1), max(0, x0):min(image.shape[1], x1)]
+        return crops
+
+    def crop_face(self, image, face=None):
+        """Padded crop around an (x, y, w, h) face box, or the center region when face is None"""
+        if face is not None:
+            (x, y, w, h) = face
+            
+            # Extract face region with some padding
+            padding = 20
+            return image[max(0, y-padding):min(image.shape[0], y+h+padding),
+                         max(0, x-padding):min(image.shape[1], x+w+padding)]
+        
+        # If no face detected, use center region
+        x, y, w, h = self.center_box(image)
+        return image[y:y+h, x:x+w]
+
+    def select_skin_pixels(self, face_region):
+        """(N, 3) array of the pixels in face_region that are likely skin"""
+        if face_region.size == 0:
+            # e.g. the center region of an image only a few pixels across
+            raise ValueError('Image is too small to analyze')
+
+        # Reshape for clustering
+        pixels = face_region.reshape(-1, 3)
+        
+        # Keep only pixels in the YCrCb skin cluster (drops hair, background, lips)
+        skin_pixels = self.segmenter.skin_pixels(face_region)
+        
+        if skin_pixels is None:
+            # Too little skin found: remove very dark and very light pixels instead
+            mask = np.all(pixels > [30, 30, 30], axis=1) & np.all(pixels < [250, 250, 250], axis=1)
+            skin_pixels = pixels[mask]
+        
+        if len(skin_pixels) == 0:
+            # Fallback to all pixels
+            skin_pixels = pixels
+        
+        return skin_pixels
+
+    def detect_faces(self, image):
+        """Detect faces at detection resolution and map the boxes back to image coordinates"""
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        
+        scale = self.detect_size / max(gray.shape[:2])
+        if scale < 1:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            faces = self.face_detector.detect(small)
+            return [tuple(int(round(v / scale)) for v in face) for face in faces]
+        
+        return [tuple(int(v) for v in face) for face in self.face_detector.detect(gray)]
+
+    def categorize_skin_tone(self, rgb_color):
+        """Categorize skin tone and determine undertones"""
+        r, g, b = (int(v) for v in rgb_color)
+        
+        # Calculate brightness
+        brightness = (r + g + b) / 3
+        
+        # Determine category and undertone with the vectorized classifiers
+        category = str(classify_category(rgb_color, self.skin_tone_categories))
+        undertone = str(classify_undertone(rgb_color))
+        
+        # Convert to other color spaces
+        hex_color = f"#{r:02x}{g:02x}{b:02x}"
+        hsl = self.rgb_to_hsl(r, g, b)
+        
+        return {
+            'category': category_label(category),
+            'undertone': undertone,
+            'rgb': f"rgb({r}, {g}, {b})",
+            'hex': hex_color,
+            'hsl': f"hsl({hsl[0]}, {hsl[1]}%, {hsl[2]}%)",
+            'brightness': brightness,
+            'dominant_color': {'r': r, 'g': g, 'b': b}
+        }
+
+    def classify_pixels(self, pixels):
+        """Category and undertone distribution (percent) over an (N, 3) pixel array
+        
+        Reported as the analysis 'pixel_votes': how much of the skin agrees with
+        the category and undertone of the dominant color. Large arrays are
+        strided down to about VOTE_SAMPLE pixels first.
+        """
+        pixels = pixels[::max(1, len(pixels) // VOTE_SAMPLE)]
+        categories = list(self.skin_tone_categories)
+        category_counts = np.bincount(category_codes(pixels, self.skin_tone_categories),
+                                      minlength=len(categories) + 1)
+        # Pixels outside every range fall back to 'medium', as in categorize_skin_tone
+        category_counts[categories.index('medium')] += category_counts[-1]
+        undertone_counts = np.bincount(undertone_codes(pixels), minlength=len(UNDERTONE_LABELS))
+        
+        total = max(len(pixels), 1)
+        return {
+            'category': {category_label(name): round(100 * int(c) / total, 1)
+                         for name, c in zip(categories, category_counts)},
+            'undertone': {str(name): round(100 * int(c) / total, 1) for name, c in zip(UNDERTONE_LABELS, undertone_counts)}
+        }
+
+    def determine_undertone(self, r, g, b):
+        """Determine undertone based on RGB values"""
+        return str(classify_undertone((r, g, b)))
+
+    def rgb_to_hsl(self, r, g, b):
+        """Convert RGB to HSL"""
+        return [int(v) for v in rgb_to_hsl((r, g, b))]
+
+    def get_product_recommendations(self, analysis):
+        """Get foundation and product recommendations based on analysis"""
+        r, g, b = analysis['dominant_color']['r'], analysis['dominant_color']['g'], analysis['dominant_color']['b']
+        
+        recommendations = []
+        
+        # Foundation recommendations: nearest shades by Delta E, top 2 per brand
+        for brand, shades in self.shade_index.nearest_per_brand((r, g, b), k=2).items():
+            for shade in shades:
+                recommendations.append({
+                    'type': 'foundation',
+                    'brand': shade['brand'],
+                    'shade': shade['shade'],
+                    'delta_e': shade['delta_e'],
+                    'match_confidence': round(max(0.0, 1 - shade['delta_e'] / 40), 2)
+                })
+        
+        # Perfect match
+        recommendations.append({
+            'type': 'perfect_match',
+            'name': 'Perfect Match',
+            'color': f"rgb({r}, {g}, {b})",
+            'hex': analysis['hex']
+        })
+        
+        # Slightly lighter
+        lighter_r = min(255, r + 20)
+        lighter_g = min(255, g + 20)
+        lighter_b = min(255, b + 20)
+        recommendations.append({
+            'type': 'lighter',
+            'name': 'Slightly Lighter',
+            'color': f"rgb({lighter_r}, {lighter_g}, {lighter_b})",
+            'hex': f"#{lighter_r:02x}{lighter_g:02x}{lighter_b:02x}"
+        })
+        
+        # Slightly darker
+        darker_r = max(0, r - 20)
+        darker_g = max(0, g - 20)
+        darker_b = max(0, b - 20)
+        recommendations.append({
+            'type': 'darker',
+            'name': 'Slightly Darker',
+            'color': f"rgb({darker_r}, {darker_g}, {darker_b})",
+            'hex': f"#{darker_r:02x}{darker_g:02x}{darker_b:02x}"
+        })
+        
+        return recommendations
@@ -0,0 +1,70 @@
+"""
+Skin segmentation for ShadeFit.
+Keeps only pixels whose chroma falls in the YCrCb skin cluster, in one
+vectorized pass over the face crop using per-thread preallocated buffers.
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+# Skin cluster bounds in full-range YCrCb (Chai & Ngan), with Y trimmed to
+# drop deep shadows, dark hair and specular highlights
+SKIN_LOWER = np.array([45, 133, 77], dtype=np.uint8)
+SKIN_UPPER = np.array([250, 173, 127], dtype=np.uint8)
+
+
+class SkinSegmenter:
+    """YCrCb skin mask with reusable conversion and mask buffers"""
+
+    def __init__(self, lower=SKIN_LOWER, upper=SKIN_UPPER, min_fraction=0.05):
+        self.lower = lower
+        self.upper = upper
+        # Below this share of skin pixels the crop is probably mis-lit or not a
+        # face, so the caller falls back to a plain brightness filter
+        self.min_fraction = min_fraction
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.pixels_seen = 0
+        self.pixels_kept = 0
+
+    def _buffers(self, shape):
+        """Per-thread YCrCb and mask buffers, grown only when a larger crop arrives"""
+        local = self._local
+        h, w = shape[:2]
+        if getattr(local, 'capacity', -1) < h * w:
+            local.capacity = h * w
+            local.ycrcb = np.empty(h * w * 3, dtype=np.uint8)
+            local.mask = np.empty(h * w, dtype=np.uint8)
+        return local.ycrcb[:h * w * 3].reshape(h, w, 3), local.mask[:h * w].reshape(h, w)
+
+    def mask(self, region):
+        """uint8 mask (255 = skin) for an RGB uint8 region; valid until the next call on this thread"""
+        region = np.ascontiguousarray(region, dtype=np.uint8)
+        ycrcb, mask = self._buffers(region.shape)
+        cv2.cvtColor(region, cv2.COLOR_RGB2YCrCb, dst=ycrcb)
+        cv2.inRange(ycrcb, self.lower, self.upper, dst=mask)
+        return mask
+
+    def skin_pixels(self, region):
+        """(N, 3) array of skin pixels from an RGB region, or None if too few are skin"""
+        region = np.ascontiguousarray(region, dtype=np.uint8)
+        mask = self.mask(region)
+        pixels = region.reshape(-1, 3)[np.flatnonzero(mask)]
+
+        with self._lock:
+            self.pixels_seen += mask.size
+            self.pixels_kept += len(pixels)
+
+        if len(pixels) < self.min_fraction * mask.size:
+            return None
+        return pixels
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pixels_seen': self.pixels_seen,
+                'pixels_kept': self.pixels_kept,
+                'kept_fraction': round(self.pixels_kept / self.pixels_seen, 4) if self.pixels_seen else None
+            }
@@ -0,0 +1,19 @@
+"""
+Skin tone category table for ShadeFit.
+Kept free of heavy imports so lightweight routes can label categories
+without loading the analysis subsystem.
+"""
+
+SKIN_TONE_CATEGORIES = {
+    'very_light': {'range': (0, 80), 'undertones': ['cool', 'neutral', 'warm']},
+    'light': {'range': (80, 120), 'undertones': ['cool', 'neutral', 'warm']},
+    'light_medium': {'range': (120, 160), 'undertones': ['cool', 'neutral', 'warm']},
+    'medium': {'range': (160, 200), 'undertones': ['cool', 'neutral', 'warm']},
+    'medium_deep': {'range': (200, 230), 'undertones': ['cool', 'neutral', 'warm']},
+    'deep': {'range': (230, 255), 'undertones': ['cool', 'neutral', 'warm']}
+}
+
+
+def category_label(name):
+    """Display label for a category key, e.g. 'light_medium' -> 'Light Medium'"""
+    return name.replace('_', ' ').title()
@@ -0,0 +1,157 @@
+"""
+Streaming video-frame analysis for ShadeFit.
+A session runs full face detection only every few frames and tracks the face
+box in between with template matching. Dominant color is updated
+incrementally with IncrementalDominantColor: k-means is warm-started from the
+previous frame's centers and the centers are smoothed with an exponential
+moving average.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import cv2
+
+from dominant_color import IncrementalDominantColor, SkinPriorEngine, skin_priors
+
+
+class StreamSession:
+    """Per-client tracking and color state"""
+
+    def __init__(self, analyzer, detect_interval=10, track_threshold=0.5, alpha=0.3,
+                 sample_size=2000, max_iter=3):
+        self.analyzer = analyzer
+        self.detect_interval = detect_interval
+        self.track_threshold = track_threshold
+        # First frame is seeded from skin priors, later frames from the previous centers
+        engine = SkinPriorEngine(sample_size=sample_size, max_iter=max_iter,
+                                 priors=skin_priors(analyzer.skin_tone_categories))
+        self.color = IncrementalDominantColor(engine, alpha=alpha)
+
+        self.frame_count = 0
+        self.detections = 0
+        self.box = None          # face box in detection-resolution coordinates
+        self.template = None     # grayscale face patch used for tracking
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _detection_gray(self, image):
+        """Grayscale copy at the analyzer's detection resolution, and its scale"""
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        scale = min(1.0, self.analyzer.detect_size / max(gray.shape[:2]))
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return gray, scale
+
+    def _detect(self, gray):
+        faces = self.analyzer.face_detector.detect(gray)
+        self.detections += 1
+        if len(faces) == 0:
+            self.box = self.template = None
+            return
+        x, y, w, h = (int(v) for v in faces[0])
+        self.box = (x, y, w, h)
+        self.template = gray[y:y + h, x:x + w].copy()
+
+    def _track(self, gray):
+        """Move the box to the best template match near its last position; False if lost"""
+        x, y, w, h = self.box
+        margin_x, margin_y = w // 2, h // 2
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(gray.shape[1], x + w + margin_x), min(gray.shape[0], y + h + margin_y)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < h or window.shape[1] < w:
+            return False
+
+        scores = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if score < self.track_threshold:
+            return False
+
+        self.box = (x0 + dx, y0 + dy, w, h)
+        self.template = gray[y0 + dy:y0 + dy + h, x0 + dx:x0 + dx + w].copy()
+        return True
+
+    def process(self, image):
+        """Analyze one RGB frame and return the current estimate"""
+        self.frame_count += 1
+        self.last_seen = time.monotonic()
+        gray, scale = self._detection_gray(image)
+
+        detected = False
+        if self.box is None or self.frame_count % self.detect_interval == 1 or not self._track(gray):
+            self._detect(gray)
+            detected = True
+
+        face = None
+        if self.box is not None:
+            face = tuple(int(round(v / scale)) for v in self.box)
+        face_region = self.analyzer.crop_face(image, face)
+        skin_pixels = self.analyzer.select_skin_pixels(face_region)
+        dominant_color = self.color.update(skin_pixels).astype(int)
+
+        return {
+            'success': True,
+            'analysis': self.analyzer.categorize_skin_tone(dominant_color),
+            'tracking': {
+                'frame': self.frame_count,
+                'detected': detected,
+                'face_found': face is not None,
+                'box': list(face) if face is not None else None
+            }
+        }
+
+
+class StreamSessionStore:
+    """Bounded set of live sessions; idle ones expire"""
+
+    def __init__(self, analyzer, max_sessions=64, idle_timeout=60, **session_options):
+        self.analyzer = analyzer
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_options = session_options
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_seen < cutoff]:
+            del self._sessions[session_id]
+
+    def create(self):
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                # Drop the least recently used session
+                self._sessions.popitem(last=False)
+            session_id = uuid.uuid4().hex
+            self._sessions[session_id] = StreamSession(self.analyzer, **self.session_options)
+            return session_id
+
+    def get(self, session_id):
+        """The live session, or None if it is unknown or has been idle past idle_timeout"""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def process_frame(self, session_id, source):
+        """Decode and analyze one frame for a session; None if the session is unknown"""
+        session = self.get(session_id)
+        if session is None:
+            return None
+        try:
+            image = self.analyzer.decoder.decode(source)
+            # Frames of one session are processed in order
+            with session.lock:
+                return session.process(image)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}